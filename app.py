@@ -4,19 +4,76 @@ ModelScope创空间启动文件
 """
 
 import os
+import signal
+import socket
 import uvicorn
 
 # 导入FastAPI应用
 from src.api_server import app
+from src.startup import preload_modules
+
+
+def serve_preforked(host: str, port: int, workers: int):
+    """
+    预加载后fork多个工作进程，共享同一监听套接字。
+
+    主进程先导入应用和重量级依赖（openai等），再fork工作进程，新进程无需重复导入；
+    工作进程意外退出时由主进程重新fork补位，补位进程同样从已预加载的状态启动。
+    """
+    preload_modules()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    def spawn() -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+            os._exit(0)
+        return pid
+
+    children = {spawn() for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            children.add(spawn())
+    sock.close()
+
 
 if __name__ == "__main__":
     # 获取端口配置，ModelScope默认使用7860端口
     port = int(os.getenv("PORT", 7860))
-    
-    # 启动FastAPI服务
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=port,
-        log_level="info"
-    )
+    # 工作进程数，大于1时启用预加载多进程模式（仅POSIX）
+    workers = int(os.getenv("AGENT_SERVER_WORKERS", "1"))
+
+    if workers > 1 and hasattr(os, "fork"):
+        serve_preforked("0.0.0.0", port, workers)
+    else:
+        # 启动FastAPI服务
+        uvicorn.run(
+            app,
+            host="0.0.0.0",
+            port=port,
+            log_level="info"
+        )
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cold-start benchmark for the Engineering Specification Extraction Agent.
+
+Every sample runs in a fresh interpreter, the way a scale-to-zero deployment
+starts. The benchmark measures:
+
+- import time of `src.agent`, `src.api_server` and the `openai` SDK;
+- latency of the first and second `run()` in a new process, with and without
+  `startup.warm_up()` beforehand (against the local mock LLM server).
+
+Usage:
+    python benchmarks/cold_start.py --samples 5 --output cold_start.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+
+from mock_llm_server import MockLLMServer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SAMPLE_DOCUMENT = os.path.join(REPO_ROOT, 'examples', 'GB50016_2014_sample.txt')
+
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+RUN_PROBE = """
+import json, logging, sys, time
+logging.disable(logging.ERROR)
+started = time.perf_counter()
+from src.agent import ExtractionAgentFinal
+timings = {{"import_s": time.perf_counter() - started}}
+if {warm}:
+    from src.startup import warm_up
+    started = time.perf_counter()
+    warm_up({base_url!r}, "bench")
+    timings["warm_up_s"] = time.perf_counter() - started
+for name in ("first_run_s", "second_run_s"):
+    started = time.perf_counter()
+    ExtractionAgentFinal({document!r}, llm_base_url={base_url!r}, llm_model_name="mock", llm_api_key="bench").run()
+    timings[name] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def _probe(code: str, env: Dict[str, str]) -> str:
+    return subprocess.check_output([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, text=True).strip().splitlines()[-1]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {"median_s": round(statistics.median(samples), 4), "min_s": round(min(samples), 4), "max_s": round(max(samples), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure agent cold-start cost in fresh interpreters.")
+    parser.add_argument("--samples", type=int, default=5, help="Fresh processes per measurement.")
+    parser.add_argument("--output", default="cold_start_results.json")
+    args = parser.parse_args()
+
+    env = {**os.environ, "AGENT_LLM_CACHE": "0", "AGENT_CONSTRAINT_STORE_PATH": ""}
+    results: Dict[str, Dict] = {}
+
+    for module in ("openai", "src.agent", "src.api_server"):
+        samples = [float(_probe(IMPORT_PROBE.format(module=module), env)) for _ in range(args.samples)]
+        results[f"import {module}"] = _summary(samples)
+
+    with MockLLMServer() as server:
+        for warm in (False, True):
+            runs = [json.loads(_probe(RUN_PROBE.format(warm=warm, base_url=server.base_url, document=SAMPLE_DOCUMENT), env))
+                    for _ in range(args.samples)]
+            label = "run after warm_up" if warm else "run without warm_up"
+            for key in runs[0]:
+                results[f"{label}: {key[:-2]}"] = _summary([r[key] for r in runs])
+
+    for name, summary in results.items():
+        print(f"{name:<40} median {summary['median_s'] * 1000:>8.1f}ms  (min {summary['min_s'] * 1000:.1f}ms)")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(),
+        "samples": args.samples,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
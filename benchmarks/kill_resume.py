@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measures what a mid-run crash costs, with and without checkpointing.
+
+An agent run is started in a child process against the mock LLM server and is
+killed with SIGKILL once a given share of its LLM requests has been made. The
+same task id is then run to completion. The benchmark reports how many LLM
+requests the rerun needed, compared with a clean run, and how many a third
+submission of the finished task makes (0 when the result is checkpointed).
+
+Usage:
+    python benchmarks/kill_resume.py --clauses 2000 --kill-at 0.5 --latency-ms 20
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+sys.path.append(os.path.dirname(__file__))
+
+from mock_llm_server import MockBehavior, MockLLMServer
+from spec_generator import write_spec
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+RUN_CHILD = """
+import logging, sys
+logging.disable(logging.ERROR)
+from src.agent import ExtractionAgentFinal
+ExtractionAgentFinal(sys.argv[1], llm_base_url=sys.argv[2], llm_model_name="mock", llm_api_key="bench",
+                     task_id=sys.argv[3], checkpoint=sys.argv[4] == "1").run()
+"""
+
+
+def _run(server: MockLLMServer, env: Dict[str, str], args, task_id: str, checkpoint: bool, kill_after: int = 0) -> Dict:
+    """Runs one child; kills it once the server has seen `kill_after` more requests (0 = run to completion)."""
+    before = server.stats["requests"]
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", RUN_CHILD, args.document, server.base_url, task_id, "1" if checkpoint else "0"],
+                             cwd=REPO_ROOT, env=env)
+    killed = False
+    while child.poll() is None:
+        if kill_after and server.stats["requests"] - before >= kill_after:
+            child.send_signal(signal.SIGKILL)
+            killed = True
+            break
+        time.sleep(0.005)
+    child.wait()
+    return {"llm_requests": server.stats["requests"] - before, "seconds": round(time.perf_counter() - started, 3), "killed": killed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of killing an agent run midway, with and without checkpoints.")
+    parser.add_argument("--clauses", type=int, default=2000, help="Size of the synthetic spec.")
+    parser.add_argument("--kill-at", type=float, default=0.5, help="Share of the clean run's LLM requests made before the kill.")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", default="kill_resume_results.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, MockLLMServer(behavior=MockBehavior(latency_ms=args.latency_ms)) as server:
+        args.document = write_spec(os.path.join(workdir, "spec.txt"), args.clauses)
+        env = {**os.environ, "AGENT_LLM_CACHE": "0", "AGENT_CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.sqlite")}
+
+        clean = _run(server, env, args, "clean", checkpoint=False)
+        kill_after = max(1, int(clean["llm_requests"] * args.kill_at))
+        print(f"clean run: {clean['llm_requests']} LLM requests in {clean['seconds']:.2f}s; killing after {kill_after}")
+
+        results = {"clean": clean}
+        for checkpoint in (False, True):
+            label = "checkpoint" if checkpoint else "no_checkpoint"
+            task_id = f"task_{label}"
+            killed = _run(server, env, args, task_id, checkpoint, kill_after)
+            rerun = _run(server, env, args, task_id, checkpoint)
+            resubmit = _run(server, env, args, task_id, checkpoint)
+            results[label] = {
+                "killed_run": killed,
+                "rerun": rerun,
+                "resubmit_after_completion": resubmit,
+                "requests_repaid": killed["llm_requests"] + rerun["llm_requests"] - clean["llm_requests"],
+            }
+            print(f"{label:<14} killed at {killed['llm_requests']:>5} requests; rerun {rerun['llm_requests']:>5} requests "
+                  f"in {rerun['seconds']:.2f}s; repaid {results[label]['requests_repaid']:>5}; "
+                  f"resubmit {resubmit['llm_requests']} requests")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"clauses": args.clauses, "kill_at": args.kill_at, "latency_ms": args.latency_ms, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
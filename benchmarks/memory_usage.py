@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark for the Engineering Specification Extraction Agent.
+
+Builds a synthetic spec in memory (100,000 clauses by default) and uses
+`tracemalloc` to measure, for each chunker:
+
+- bytes retained by `document_chunks` per chunk, on top of the document itself,
+  and the peak while chunking;
+- bytes per `ExtractionResult` record, excluding its raw text;
+- bytes retained per validated item after `_finalize`.
+
+No LLM is called: extraction results are produced locally from each chunk with
+the mock server's `extract_constraints`.
+
+Usage:
+    python benchmarks/memory_usage.py --clauses 100000 --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Dict
+
+os.environ.setdefault("AGENT_LLM_CACHE", "0")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(__file__))
+
+from src.agent import ExtractionAgentFinal, ExtractionResult
+from mock_llm_server import extract_constraints
+from spec_generator import generate_spec
+
+
+def _traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure(document: str, chunker: str) -> Dict:
+    # --- The agent is never run, so the endpoint is never contacted ---
+    agent = ExtractionAgentFinal("synthetic_spec.txt", llm_base_url="http://127.0.0.1:9/v1", llm_model_name="mock",
+                                 llm_api_key="bench", chunker=chunker)
+    agent.document_content = document
+    rng = random.Random(0)
+
+    before = _traced()
+    tracemalloc.reset_peak()
+    agent._analyze_structure()
+    chunks = len(agent.document_chunks)
+    chunk_bytes = _traced() - before
+    chunk_peak = tracemalloc.get_traced_memory()[1] - before
+
+    before = _traced()
+    records = [ExtractionResult(raw_text=None, source_ref=c.source_ref, goal_id="goal_firewall") for c in agent.document_chunks]
+    result_bytes = _traced() - before
+    del records
+
+    agent.extraction_results = [
+        ExtractionResult(raw_text=json.dumps(extract_constraints(f"Extract constraints from this text:\n\n{c.text}", rng=rng),
+                                             ensure_ascii=False),
+                         source_ref=c.source_ref, goal_id="goal_firewall")
+        for c in agent.document_chunks
+    ]
+    agent._validate()
+    agent._finalize()
+    items = len(agent.final_result["validated_items"])
+    with_items = _traced()
+    agent.final_result = None
+    agent.validated_items = []
+    item_bytes = with_items - _traced()
+
+    return {
+        "chunks": chunks,
+        "chunk_bytes": chunk_bytes,
+        "bytes_per_chunk": round(chunk_bytes / max(chunks, 1), 1),
+        "chunking_peak_bytes": chunk_peak,
+        "bytes_per_extraction_result": round(result_bytes / max(chunks, 1), 1),
+        "items": items,
+        "item_bytes": item_bytes,
+        "bytes_per_item": round(item_bytes / max(items, 1), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-chunk and per-item memory on a synthetic spec.")
+    parser.add_argument("--clauses", type=int, default=100000, help="Size of the synthetic spec.")
+    parser.add_argument("--chunkers", default="blank_line,clause")
+    parser.add_argument("--output", default="memory_results.json")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    document = generate_spec(args.clauses)
+    tracemalloc.start()
+    results = {}
+    for chunker in args.chunkers.split(","):
+        results[chunker] = measure(document, chunker)
+        r = results[chunker]
+        print(f"{chunker:<11} {r['chunks']:>7} chunks  {r['bytes_per_chunk']:>8.1f} B/chunk  "
+              f"peak {r['chunking_peak_bytes'] / 2 ** 20:>6.1f} MiB  {r['bytes_per_extraction_result']:>6.1f} B/result  "
+              f"{r['items']:>7} items  {r['bytes_per_item']:>7.1f} B/item")
+    tracemalloc.stop()
+
+    report = {
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(),
+        "clauses": args.clauses,
+        "document_chars": len(document),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
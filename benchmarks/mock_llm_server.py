@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local mock of an OpenAI-compatible chat-completions endpoint.
+
+Answers the agent's extraction and repair prompts deterministically from the
+prompt text (numeric clauses such as "不应小于6.0m" become constraints), with
+configurable latency, failure rate and malformed-JSON rate, so the agent can be
+benchmarked end to end without a real LLM.
+
+Usage:
+    python benchmarks/mock_llm_server.py --port 8901 --latency-ms 200 --failure-rate 0.05
+    # then point the agent at it: llm_base_url="http://127.0.0.1:8901/v1"
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+_CHUNK_TAG_RE = re.compile(r"^\[\[(chunk_\d+)\]\]$")
+_GOAL_ID_RE = re.compile(r"\b(goal_[A-Za-z0-9_]+)\b")
+_CLAUSE_REF_RE = re.compile(r"^\s*(\d+(?:\.\d+){2,})\s")
+_SUBJECT_SPLIT_RE = re.compile(r"[的应，、：]")
+_CONSTRAINT_RE = re.compile(r"(不应小于|不应低于|不应大于|不应超过)\s*(\d+(?:\.\d+)?)\s*([A-Za-z%²]+)?")
+_OPERATORS = {"不应小于": ">=", "不应低于": ">=", "不应大于": "<=", "不应超过": "<="}
+_REPAIR_ENTRY_RE = re.compile(r"^\[(\d+)\] Errors: .*?\nInvalid JSON: (.*)$", re.MULTILINE)
+
+
+@dataclass
+class MockBehavior:
+    """Knobs for the mock endpoint; rates are probabilities per request (or per item for `invalid_item_rate`)."""
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+    throttle_rate: float = 0.0
+    malformed_rate: float = 0.0
+    invalid_item_rate: float = 0.0
+    seed: int = 0
+
+
+def extract_constraints(user_prompt: str, system_prompt: str = "", rng: Optional[random.Random] = None,
+                        invalid_item_rate: float = 0.0) -> List[Dict]:
+    """Builds the constraint items a well-behaved model would return for an extraction prompt."""
+    rng = rng or random.Random(0)
+    goal_ids = _GOAL_ID_RE.findall(user_prompt.split("from th", 1)[0]) if "goal_id" in system_prompt else []
+    chunk_id, source_ref, items = None, None, []
+    for line in user_prompt.splitlines():
+        tag = _CHUNK_TAG_RE.match(line.strip())
+        if tag:
+            chunk_id, source_ref = tag.group(1), None
+            continue
+        clause = _CLAUSE_REF_RE.match(line)
+        if clause:
+            source_ref = clause.group(1)
+        subject = _SUBJECT_SPLIT_RE.split(line[clause.end():] if clause else line.strip(), 1)[0].strip()[:12]
+        for phrase, value, unit in _CONSTRAINT_RE.findall(line):
+            item = {
+                "applicable_object": subject or "构件",
+                "constraint_content": line.strip()[:80],
+                "value": float(value),
+                "unit": unit or None,
+                "operator": _OPERATORS[phrase],
+                "source_ref": source_ref or "unknown",
+            }
+            if invalid_item_rate and rng.random() < invalid_item_rate:
+                item["operator"] = "approx"
+            if chunk_id:
+                item["chunk_id"] = chunk_id
+            if goal_ids:
+                item["goal_id"] = goal_ids[0]
+            items.append(item)
+    return items
+
+
+def repair_entries(user_prompt: str) -> List[Dict]:
+    """Answers a batched repair prompt: every numbered input comes back fixed."""
+    answers = []
+    for index, payload in _REPAIR_ENTRY_RE.findall(user_prompt):
+        try:
+            item = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+        items = item if isinstance(item, list) else [item]
+        for entry in items:
+            if isinstance(entry, dict):
+                if entry.get("operator") not in _OPERATORS.values():
+                    entry["operator"] = ">="
+                if isinstance(entry.get("value"), (int, float)) and not entry.get("unit"):
+                    entry["unit"] = "m"
+        answers.append({"index": int(index), "items": items})
+    return answers
+
+
+def malform(text: str, rng: random.Random) -> str:
+    """Damages a JSON answer the way models do: code fences, trailing commas, or truncation."""
+    kind = rng.choice(("fence", "trailing_comma", "truncate"))
+    if kind == "fence":
+        return f"```json\n{text}\n```"
+    if kind == "trailing_comma" and text.endswith("]") and len(text) > 2:
+        return text[:-1] + ",]"
+    return text[: max(1, len(text) // 2)]
+
+
+def build_completion(system_prompt: str, user_prompt: str, behavior: MockBehavior, rng: random.Random) -> str:
+    if "JSON repair expert" in system_prompt:
+        content = json.dumps(repair_entries(user_prompt), ensure_ascii=False)
+    else:
+        content = json.dumps(extract_constraints(user_prompt, system_prompt, rng, behavior.invalid_item_rate), ensure_ascii=False)
+    if behavior.malformed_rate and rng.random() < behavior.malformed_rate:
+        content = malform(content, rng)
+    return content
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockLLMServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        behavior, rng = self.server.behavior, self.server.next_rng()
+        self.server.count("requests")
+        delay = max(0.0, behavior.latency_ms + rng.uniform(-1, 1) * behavior.latency_jitter_ms) / 1000
+        if delay:
+            time.sleep(delay)
+        if behavior.throttle_rate and rng.random() < behavior.throttle_rate:
+            self.server.count("throttled")
+            self._send(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}}, {"Retry-After": "0.05"})
+            return
+        if behavior.failure_rate and rng.random() < behavior.failure_rate:
+            self.server.count("failed")
+            self._send(500, {"error": {"message": "mock upstream failure", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user_prompt = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        content = build_completion(system_prompt, user_prompt, behavior, rng)
+        prompt_tokens = (len(system_prompt) + len(user_prompt)) // 2
+        completion_tokens = len(content) // 2
+        self._send(200, {
+            "id": f"chatcmpl-mock-{rng.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded mock server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, behavior: Optional[MockBehavior] = None):
+        super().__init__((host, port), _Handler)
+        self.behavior = behavior or MockBehavior()
+        self.stats = {"requests": 0, "throttled": 0, "failed": 0}
+        self._rng = random.Random(self.behavior.seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_rng(self) -> random.Random:
+        with self._lock:
+            return random.Random(self._rng.getrandbits(64))
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def handle_error(self, request, client_address):
+        # --- Clients that are killed or time out mid-response are expected; anything else is still reported ---
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def __enter__(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of answers with damaged JSON.")
+    parser.add_argument("--invalid-item-rate", type=float, default=0.0, help="Share of items with a schema error that needs LLM repair.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    behavior = MockBehavior(args.latency_ms, args.latency_jitter_ms, args.failure_rate, args.throttle_rate,
+                            args.malformed_rate, args.invalid_item_rate, args.seed)
+    server = MockLLMServer(args.host, args.port, behavior)
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Component benchmarks for the Engineering Specification Extraction Agent.
+
+Times `_analyze_structure` (both chunkers), goal routing, relevance scoring,
+`_validate`, `_repair` and a full `run()` on synthetic specs of several sizes,
+against the local mock LLM server. Results are written as JSON; pass `--baseline` with an
+earlier results file to fail on regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10,1000,10000 --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# --- Benchmarks measure the agent, not the response cache ---
+os.environ.setdefault("AGENT_LLM_CACHE", "0")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(__file__))
+
+import src.agent as agent_module
+from src.agent import ExtractionAgentFinal, ExtractionResult
+from src.keyword_index import KeywordIndex
+from src.relevance import route_by_relevance
+from mock_llm_server import MockBehavior, MockLLMServer, extract_constraints
+from spec_generator import write_spec
+
+RESULTS_SCHEMA_VERSION = 1
+# --- Slowdowns smaller than this are timer noise, whatever the relative change ---
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchContext:
+    """Shared state for one document size: the spec file and the mock server."""
+
+    def __init__(self, path: str, server: MockLLMServer, invalid_item_rate: float):
+        self.path = path
+        self.server = server
+        self.invalid_item_rate = invalid_item_rate
+        with open(path, encoding="utf-8") as f:
+            self.text = f.read()
+
+    def agent(self, **options) -> ExtractionAgentFinal:
+        agent = ExtractionAgentFinal(self.path, llm_base_url=self.server.base_url, llm_model_name="mock", llm_api_key="bench", **options)
+        agent.document_content = self.text
+        return agent
+
+    def chunked_agent(self) -> ExtractionAgentFinal:
+        agent = self.agent()
+        agent._analyze_structure()
+        agent._plan_extraction()
+        return agent
+
+    def validated_agent(self) -> ExtractionAgentFinal:
+        """An agent holding one mock extraction result per chunk, ready for `_validate`."""
+        agent = self.chunked_agent()
+        rng = random.Random(0)
+        agent.extraction_results = [
+            ExtractionResult(
+                raw_text=json.dumps(extract_constraints(f"Extract constraints from this text:\n\n{chunk.text}", rng=rng,
+                                                        invalid_item_rate=self.invalid_item_rate), ensure_ascii=False),
+                source_ref=chunk.source_ref, goal_id="goal_firewall")
+            for chunk in agent.document_chunks
+        ]
+        return agent
+
+
+# --- Each benchmark returns (setup, measured step, units processed by the step) ---
+def bench_analyze_structure(chunker: str):
+    def setup(ctx: BenchContext):
+        return ctx.agent(chunker=chunker)
+
+    def step(agent: ExtractionAgentFinal) -> Tuple[int, str]:
+        agent._analyze_structure()
+        return len(agent.document_chunks), "chunks"
+    return setup, step
+
+
+def bench_goal_routing():
+    def setup(ctx: BenchContext):
+        agent = ctx.chunked_agent()
+        return KeywordIndex(agent.extraction_goals), agent.document_chunks
+
+    def step(state) -> Tuple[int, str]:
+        index, chunks = state
+        index.route(chunks)
+        return len(chunks), "chunks"
+    return setup, step
+
+
+def bench_relevance_scoring():
+    def setup(ctx: BenchContext):
+        return ctx.chunked_agent()
+
+    def step(agent: ExtractionAgentFinal) -> Tuple[int, str]:
+        route_by_relevance(agent.extraction_goals, agent.document_chunks, agent.relevance_threshold, agent.relevance_top_k,
+                           agent.relevance_min_score)
+        return len(agent.document_chunks), "chunks"
+    return setup, step
+
+
+def bench_validate():
+    def step(agent: ExtractionAgentFinal) -> Tuple[int, str]:
+        results = len(agent.extraction_results)
+        agent._validate()
+        return results, "results"
+    return (lambda ctx: ctx.validated_agent()), step
+
+
+def bench_repair():
+    def setup(ctx: BenchContext):
+        agent = ctx.validated_agent()
+        agent._validate()
+        return agent
+
+    def step(agent: ExtractionAgentFinal) -> Tuple[int, str]:
+        failed = len(agent.failed_items)
+        agent._repair()
+        return failed, "failed_items"
+    return setup, step
+
+
+def bench_run():
+    def setup(ctx: BenchContext):
+        return ExtractionAgentFinal(ctx.path, llm_base_url=ctx.server.base_url, llm_model_name="mock", llm_api_key="bench")
+
+    def step(agent: ExtractionAgentFinal) -> Tuple[int, str]:
+        agent.run()
+        return len(agent.document_chunks), "chunks"
+    return setup, step
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "analyze_structure.blank_line": lambda: bench_analyze_structure("blank_line"),
+    "analyze_structure.clause": lambda: bench_analyze_structure("clause"),
+    "goal_routing": bench_goal_routing,
+    "relevance_scoring": bench_relevance_scoring,
+    "validate": bench_validate,
+    "repair": bench_repair,
+    "run": bench_run,
+}
+
+
+def measure(name: str, ctx: BenchContext, size: int, repeat: int) -> Dict:
+    setup, step = BENCHMARKS[name]()
+    timings, units, unit_name = [], 0, ""
+    requests_before = ctx.server.stats["requests"]
+    for _ in range(repeat):
+        state = setup(ctx)
+        started = time.perf_counter()
+        units, unit_name = step(state)
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "size": size,
+        "repeat": repeat,
+        "median_s": round(median, 6),
+        "min_s": round(min(timings), 6),
+        "max_s": round(max(timings), 6),
+        "units": units,
+        "unit_name": unit_name,
+        "units_per_s": round(units / median, 2) if median > 0 else None,
+        "llm_requests": (ctx.server.stats["requests"] - requests_before) // repeat,
+    }
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Returns a message for every benchmark whose median got slower than the baseline by more than `tolerance`."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["name"], result["size"]))
+        if (before and before["median_s"] > 0 and result["median_s"] > before["median_s"] * (1 + tolerance)
+                and result["median_s"] - before["median_s"] > MIN_REGRESSION_SECONDS):
+            regressions.append(f"{result['name']} @ {result['size']}: {before['median_s']:.4f}s -> {result['median_s']:.4f}s "
+                               f"(+{(result['median_s'] / before['median_s'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agent component benchmarks.")
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma-separated clause counts of the synthetic specs.")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="Comma-separated benchmark names.")
+    parser.add_argument("--run-max-size", type=int, default=1000, help="Skip full run() above this many clauses.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock LLM latency per request.")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.02)
+    parser.add_argument("--invalid-item-rate", type=float, default=0.05)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. the baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    # --- Per-call log lines would dominate the small benchmarks and flood the report ---
+    logging.disable(logging.ERROR)
+    if not agent_module.LLM_AVAILABLE:
+        print("⚠️  openai is not installed; LLM calls use the agent's built-in mock instead of the mock server.")
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    names = [n for n in args.benchmarks.split(",") if n]
+    behavior = MockBehavior(latency_ms=args.latency_ms, failure_rate=args.failure_rate,
+                            malformed_rate=args.malformed_rate, invalid_item_rate=args.invalid_item_rate)
+    results = []
+    with MockLLMServer(behavior=behavior) as server, tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            ctx = BenchContext(write_spec(os.path.join(workdir, f"spec_{size}.txt"), size), server, args.invalid_item_rate)
+            for name in names:
+                if name == "run" and size > args.run_max_size:
+                    continue
+                result = measure(name, ctx, size, args.repeat)
+                results.append(result)
+                print(f"{name:<30} {size:>7} clauses  median {result['median_s']:>9.4f}s  "
+                      f"{result['units']:>7} {result['unit_name']:<12} {result['llm_requests']:>6} LLM requests")
+
+    report = {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "agent_version": "2.6.0",
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(),
+        "llm_backend": "mock_server" if agent_module.LLM_AVAILABLE else "builtin_mock",
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"❌ REGRESSION: {message}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
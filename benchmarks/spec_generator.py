@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic GB-style specification generator for benchmarks.
+
+Produces documents shaped like examples/GB50016_2014_sample.txt (chapters,
+numbered sections, numbered clauses with numeric limits, and box-drawing
+tables) at any size, deterministically for a given seed.
+
+Usage:
+    python benchmarks/spec_generator.py --clauses 10000 --output /tmp/spec_10k.txt
+"""
+
+import argparse
+import random
+from typing import Iterator, List
+
+OBJECTS = ["防火墙", "防火门", "疏散楼梯间", "安全出口", "前室", "承重墙", "楼板", "疏散走道", "防烟楼梯间", "避难层", "管道井", "吊顶"]
+TOPICS = ["建筑分类", "耐火等级", "防火间距", "防火分隔", "建筑材料", "安全疏散", "消防设施", "防烟排烟"]
+LIMITS = [
+    ("的耐火极限不应低于{v:.2f}h", (0.5, 4.0)),
+    ("的净宽度不应小于{v:.2f}m", (0.8, 3.0)),
+    ("与相邻建筑的防火间距不应小于{v:.0f}m", (6, 50)),
+    ("的面积不应大于{v:.0f}m²", (6, 500)),
+    ("的疏散距离不应超过{v:.0f}m", (15, 60)),
+]
+PLAIN_CLAUSES = [
+    "应采用不燃烧体材料制作，其燃烧性能等级应为A级。",
+    "应设置自闭功能，并应配备闭门器。",
+    "应根据建筑的使用功能、火灾危险性等因素确定。",
+    "内部装修材料不应采用B3级易燃烧材料。",
+]
+GRADES = ["一级", "二级", "三级", "四级"]
+
+
+def _clause_text(rng: random.Random) -> str:
+    subject = rng.choice(OBJECTS)
+    if rng.random() < 0.7:
+        template, (low, high) = rng.choice(LIMITS)
+        return subject + template.format(v=rng.uniform(low, high)) + "。"
+    return subject + rng.choice(PLAIN_CLAUSES)
+
+
+def _table(rng: random.Random, caption: str, rows: int) -> List[str]:
+    lines = [caption, "┌────────────┬──────────┬──────────┬──────────┬──────────┐",
+             "│ 构件名称   │ " + " │ ".join(f"{g}    " for g in GRADES) + " │",
+             "├────────────┼──────────┼──────────┼──────────┼──────────┤"]
+    for _ in range(rows):
+        name = rng.choice(OBJECTS)
+        values = sorted((rng.uniform(0.5, 4.0) for _ in GRADES), reverse=True)
+        lines.append(f"│ {name:<8} │ " + " │ ".join(f"{v:.2f}h   " for v in values) + " │")
+    lines.append("└────────────┴──────────┴──────────┴──────────┴──────────┘")
+    return lines
+
+
+def iter_spec_lines(clauses: int, seed: int = 0, clauses_per_section: int = 8, sections_per_chapter: int = 6,
+                    table_every: int = 20) -> Iterator[str]:
+    """Yields the lines of a synthetic spec with `clauses` numbered clauses and a table every `table_every` clauses."""
+    rng = random.Random(seed)
+    yield f"《合成建筑设计防火规范》GB 00000-{seed:04d}（基准测试用）"
+    written, chapter = 0, 0
+    while written < clauses:
+        chapter += 1
+        yield ""
+        yield f"第{chapter}章 {TOPICS[(chapter - 1) % len(TOPICS)]}"
+        for section in range(1, sections_per_chapter + 1):
+            if written >= clauses:
+                break
+            yield ""
+            yield f"{chapter}.{section} {rng.choice(OBJECTS)}{rng.choice(['一般规定', '设置要求', '构造要求'])}"
+            table_lines: List[str] = []
+            for number in range(1, clauses_per_section + 1):
+                if written >= clauses:
+                    break
+                ref = f"{chapter}.{section}.{number}"
+                written += 1
+                if table_every and written % table_every == 0:
+                    yield f"{ref} 不同耐火等级建筑构件的耐火极限应符合表{ref}的规定。"
+                    table_lines = _table(rng, f"表{ref} 构件耐火极限", rng.randint(3, 8))
+                else:
+                    yield f"{ref} {_clause_text(rng)}"
+                if rng.random() < 0.15:
+                    yield f"    a) {rng.choice(OBJECTS)}：{_clause_text(rng)}"
+            if table_lines:
+                yield ""
+                yield from table_lines
+
+
+def generate_spec(clauses: int, seed: int = 0, **options) -> str:
+    return "\n".join(iter_spec_lines(clauses, seed, **options)) + "\n"
+
+
+def write_spec(path: str, clauses: int, seed: int = 0, **options) -> str:
+    """Writes a synthetic spec to `path` line by line and returns the path."""
+    with open(path, "w", encoding="utf-8") as f:
+        for line in iter_spec_lines(clauses, seed, **options):
+            f.write(line + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic GB-style specification.")
+    parser.add_argument("--clauses", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--table-every", type=int, default=20, help="Insert a table every N clauses (0 = no tables).")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    write_spec(args.output, args.clauses, args.seed, table_every=args.table_every)
+    print(f"Wrote {args.clauses} clauses to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
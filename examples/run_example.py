@@ -15,12 +15,14 @@ Usage:
 import os
 import sys
 import argparse
-import logging
 
 # Add the src directory to the Python path to allow importing the agent
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.agent import ExtractionAgentFinal
+from src.log_config import configure_logging, shutdown_logging
+
+LOG_FILE = 'agent_mvp_final.log'
 
 def main():
     """Main function to run the agent and display results."""
@@ -44,8 +46,10 @@ def main():
     print("--- " * 20)
 
     # --- Run the Agent ---
+    configure_logging(json_format=False, log_file=LOG_FILE, file_mode='w')
     agent = ExtractionAgentFinal(document_path=args.document)
     final_json_output = agent.run()
+    shutdown_logging()  # flush the log queue before the log file is read below
 
     # --- Display Results ---
     print("\n" + "--- " * 20)
@@ -61,9 +65,8 @@ def main():
     print("This shows the agent's self-repair process.")
     print("--- " * 20)
 
-    log_file = 'agent_mvp_final.log'
-    if os.path.exists(log_file):
-        with open(log_file, 'r') as f:
+    if os.path.exists(LOG_FILE):
+        with open(LOG_FILE, 'r', encoding='utf-8') as f:
             found_validation = False
             found_repair = False
             for line in f:
@@ -79,7 +82,7 @@ def main():
                 if found_repair and "STATE TRANSITION: REPAIR -> VALIDATION" in line:
                     print(f"   [REPAIRED] {line.strip()}")
 
-    print("\nFull execution trace is available in 'agent_mvp_final.log'")
+    print(f"\nFull execution trace is available in '{LOG_FILE}'")
 
 if __name__ == "__main__":
     main()
@@ -51,6 +51,10 @@ def process_sse_stream():
                         # --- 事件处理 ---
                         if event_type == "status_update":
                             handle_status_update(data)
+                        elif event_type == "items":
+                            handle_items(data)
+                        elif event_type == "repair":
+                            handle_repair(data)
                         elif event_type == "final_result":
                             handle_final_result(data)
                             break  # 任务完成，退出循环
@@ -69,6 +73,18 @@ def handle_status_update(data):
     status = data.get("status")
     print(f"⏳ [状态更新] 任务 {task_id[:8]}...: {status}")
 
+def handle_items(data):
+    """处理增量抽取结果事件（某个文档块的条目校验通过后立即推送）"""
+    items = data.get("items", [])
+    print(f"📥 [增量结果] {data.get('source_ref')}: {len(items)} 条约束")
+
+def handle_repair(data):
+    """处理修复事件"""
+    if data.get("outcome") == "discarded":
+        print(f"🗑️  [修复] {data.get('source_ref')}: 超过最大重试次数，已丢弃")
+    else:
+        print(f"🔧 [修复] {data.get('source_ref')}: 第{data.get('attempt')}次修复，返回 {data.get('answered')}/{data.get('requested')} 条")
+
 def handle_final_result(data):
     """处理最终结果事件"""
     task_id = data.get("task_id")
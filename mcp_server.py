@@ -3,22 +3,33 @@ ModelScope MCP Server Entry Point
 """
 
 import os
+import uuid
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import StreamingResponse
-import asyncio
+from fastapi.responses import StreamingResponse, PlainTextResponse
 import json
+from contextlib import asynccontextmanager
 
 from src.agent import ExtractionAgentFinal
 from src.billing_decision import decide_billing
+from src import metrics
+from src.log_config import configure_logging, shutdown_logging
+from src.startup import warm_up
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    warm_up()
+    yield
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- Authentication ---
 AGENT_API_KEY = os.environ.get("AGENT_API_KEY", "your_agent_api_key")
 
 @app.middleware("http")
 async def authenticate_request(request: Request, call_next):
-    if request.url.path == "/health":
+    if request.url.path in ("/health", "/metrics"):
         return await call_next(request)
     
     api_key = request.headers.get("X-API-Key")
@@ -36,25 +47,55 @@ async def event_stream(request: Request):
     llm_base_url = body.get("llm_base_url")
     llm_model_name = body.get("llm_model_name")
     llm_api_key = body.get("llm_api_key")
+    task_id = f"task_{uuid.uuid4()}"
 
     agent = ExtractionAgentFinal(
         document_path=document_path,
         llm_base_url=llm_base_url,
         llm_model_name=llm_model_name,
-        llm_api_key=llm_api_key
+        llm_api_key=llm_api_key,
+        task_id=task_id,
+        user_id=user_id
     )
 
+    def sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
     async def stream_events():
+        metrics.TASKS_IN_FLIGHT.inc(server="mcp")
         try:
+            # --- Events are forwarded as soon as the agent emits them; no pacing delay ---
             async for event in agent.run_in_stream():
-                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
-                await asyncio.sleep(0.1)
+                if event['event'] != "final_result":
+                    yield sse(event['event'], {"task_id": task_id, **event['data']})
+                    continue
+                agent_result = event['data']
+                if agent_result.get("status") == "failed":
+                    yield sse("error", {
+                        "task_id": task_id, "user_id": user_id, "document_path": document_path,
+                        "status": "failed",
+                        "billing": decide_billing({"status": "AGENT_EXECUTION_FAILURE"}),
+                        "error_message": agent_result.get("error")
+                    })
+                    continue
+                yield sse("final_result", {
+                    "task_id": task_id, "user_id": user_id, "document_path": document_path,
+                    "status": "completed",
+                    "billing": decide_billing({
+                        "status": agent_result.get("status", "completed"),
+                        "validated_count": len(agent_result.get("validated_items", [])),
+                    }),
+                    "result": agent_result
+                })
         except Exception as e:
-            error_event = {
-                "event": "error",
-                "data": {"error": str(e)}
-            }
-            yield f"event: {error_event['event']}\ndata: {json.dumps(error_event['data'])}\n\n"
+            yield sse("error", {
+                "task_id": task_id, "user_id": user_id, "document_path": document_path,
+                "status": "failed",
+                "billing": decide_billing({"status": "AGENT_EXECUTION_FAILURE"}),
+                "error_message": str(e)
+            })
+        finally:
+            metrics.TASKS_IN_FLIGHT.dec(server="mcp")
 
     return StreamingResponse(stream_events(), media_type="text/event-stream")
 
@@ -63,6 +104,10 @@ async def event_stream(request: Request):
 async def extract(request: Request):
     return await event_stream(request)
 
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
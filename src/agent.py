@@ -1,32 +1,46 @@
 
 import json
+import sys
 import uuid
+import hashlib
 import time
 import os
+import asyncio
 from enum import Enum
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable, AsyncIterator
 from datetime import datetime
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import logging
+import threading
+import contextvars
+import importlib.util
 
-# --- Setup Logging ---
-logging.basicConfig(
-    level=logging.INFO,
-    format=\'[%(asctime)s] %(levelname)s: %(message)s\',
-    handlers=[
-        logging.FileHandler(\'agent_mvp_final.log\', mode=\'w\'),
-        logging.StreamHandler()
-    ]
-)
+from .llm_cache import LLMResponseCache, get_default_cache, make_cache_key, peek_default_cache
+from .llm_clients import LLMClientRegistry, get_client_registry
+from .llm_resilience import (CircuitOpenError, EndpointGuard, backoff_delay, error_status, get_endpoint_guard,
+                             is_retryable, retry_after_seconds)
+from .keyword_index import KeywordIndex
+from .relevance import route_by_relevance
+from .schema_validator import SchemaValidator
+from .local_repair import parse_llm_json, repair_item
+from . import metrics
+from .chunk_store import chunk_hash, constraint_fingerprint, get_chunk_store
+from .checkpoint_store import get_checkpoint_store, run_fingerprint
+from .chunking import Chunk, estimate_tokens, iter_blank_line_chunks, iter_clause_chunks, split_blank_line_chunks
+from .log_config import log_context
+from . import serialization
+
+# --- Logging: handlers are installed by the application (see log_config.configure_logging) ---
 logger = logging.getLogger(__name__)
 
 # --- LLM Integration ---
-try:
-    from openai import OpenAI
-    LLM_AVAILABLE = True
-except ImportError:
+# The openai package is only located here; llm_clients imports it when the first client is built,
+# which keeps it (~0.5s) off the import path. Servers preload it at startup, see startup.warm_up.
+LLM_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not LLM_AVAILABLE:
     logger.warning("OpenAI library not found. LLM calls will be mocked.")
-    LLM_AVAILABLE = False
 
 # --- Agent State Machine ---
 class AgentState(Enum):
@@ -34,21 +48,37 @@ class AgentState(Enum):
     DOCUMENT_INGEST = 2
     STRUCTURE_ANALYSIS = 3
     PLANNING = 4
-    EXTRACTION = 5
-    VALIDATION = 6
-    REPAIR = 7
-    FINALIZE = 8
-    ERROR = 9
-    DONE = 10
+    RELEVANCE = 5
+    EXTRACTION = 6
+    VALIDATION = 7
+    REPAIR = 8
+    FINALIZE = 9
+    ERROR = 10
+    DONE = 11
 
 # --- Data Models ---
-@dataclass
 class ExtractionResult:
-    raw_text: str
-    source_ref: str
-    goal_id: str
-    parsed_json: Optional[List[Dict]] = None
-    error: Optional[str] = None
+    """Raw LLM output for one prompt; slotted, since a large document produces one per call."""
+
+    __slots__ = ("raw_text", "source_ref", "goal_id", "parsed_json", "error", "chunk_refs", "goal_ids", "retry_count")
+
+    def __init__(self, raw_text: Optional[str], source_ref: str, goal_id: str, parsed_json: Optional[List[Dict]] = None,
+                 error: Optional[str] = None, chunk_refs: Optional[Dict[str, str]] = None,
+                 goal_ids: Optional[List[str]] = None, retry_count: int = 0):
+        self.raw_text = raw_text
+        self.source_ref = source_ref
+        self.goal_id = goal_id
+        self.parsed_json = parsed_json
+        self.error = error
+        # --- Set for multi-chunk prompts: chunk tag -> source_ref ---
+        self.chunk_refs = chunk_refs
+        # --- Set for multi-goal prompts: goal ids each returned item must be tagged with ---
+        self.goal_ids = goal_ids
+        # --- Number of REPAIR rounds this result has been through ---
+        self.retry_count = retry_count
+
+    def __repr__(self) -> str:
+        return f"ExtractionResult(source_ref={self.source_ref!r}, goal_id={self.goal_id!r}, retry_count={self.retry_count})"
 
 # --- Output Schema Definition ---
 OUTPUT_SCHEMA = {
@@ -67,212 +97,843 @@ OUTPUT_SCHEMA = {
     "required": ["source_ref", "applicable_object", "constraint_content"]
 }
 
+class ChunkPacker:
+    """Greedy packer that emits a batch of chunks whenever the next chunk would overflow the token budget."""
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self.batch: List[Chunk] = []
+        self.tokens = 0
+
+    def add(self, chunk: Chunk) -> Optional[List[Chunk]]:
+        if self.token_budget <= 0:
+            return [chunk]
+        chunk_tokens = estimate_tokens(chunk.text) + 8  # tag line and separator
+        full = None
+        if self.batch and self.tokens + chunk_tokens > self.token_budget:
+            full = self.flush()
+        self.batch.append(chunk)
+        self.tokens += chunk_tokens
+        return full
+
+    def flush(self) -> Optional[List[Chunk]]:
+        batch, self.batch, self.tokens = self.batch, [], 0
+        return batch or None
+
+# --- Compiled once; shared by every agent instance ---
+ITEM_VALIDATOR = SchemaValidator(OUTPUT_SCHEMA)
+OUTPUT_SCHEMA_JSON = json.dumps(OUTPUT_SCHEMA)
+EXTRACTION_SYSTEM_PROMPT = f"""You are an expert extraction AI. Extract constraints from the text based on the user's goal. Return ONLY a valid JSON array of objects matching this schema: {OUTPUT_SCHEMA_JSON}. If no constraints are found, return an empty array []."""
+REPAIR_SYSTEM_PROMPT = f"""You are a JSON repair expert. Each numbered input below is invalid JSON or an invalid object, followed by its validation errors. Correct every input based on its errors and the schema. Return ONLY a valid JSON array with one entry per input, in the form {{"index": <input number>, "items": [<corrected objects>]}}. Schema: {OUTPUT_SCHEMA_JSON}"""
+
+# --- Short fields that repeat across thousands of items; interned so equal values share one string ---
+INTERNED_ITEM_FIELDS = ("applicable_object", "unit", "operator", "source_ref")
+
+
+def _intern_fields(item: Dict[str, Any]):
+    for field in INTERNED_ITEM_FIELDS:
+        value = item.get(field)
+        if type(value) is str:
+            item[field] = sys.intern(value)
+
 # --- LLM Client ---
 class LLMClient:
-    def __init__(self, base_url: Optional[str] = None, model_name: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(self, base_url: Optional[str] = None, model_name: Optional[str] = None, api_key: Optional[str] = None,
+                 cache: Optional[LLMResponseCache] = None, use_cache: bool = True, registry: Optional[LLMClientRegistry] = None):
         # --- Default to Zhipu GLM-4.5-Flash if no custom config is provided ---
         self.base_url = base_url or "https://open.bigmodel.cn/api/paas/v4"
         self.model_name = model_name or "glm-4-flash"
         self.api_key = api_key or "2cb6d2e323ed4f3badc136090daa0ccb.87GF3FfJmNUuQcSd"
-        
-        self.client = None
-        if LLM_AVAILABLE:
-            try:
-                self.client = OpenAI(
-                    base_url=self.base_url,
-                    api_key=self.api_key
-                )
-                logger.info(f"LLM Client initialized with model: {self.model_name} at {self.base_url}")
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
+        self.temperature = 0.1
+        self.max_tokens = 1024
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        # --- Retries for 429/5xx/transport errors, and the latency percentile after which a duplicate request is sent (0 = off) ---
+        self.max_retries = int(os.getenv("AGENT_LLM_MAX_RETRIES", "3"))
+        self.hedge_percentile = float(os.getenv("AGENT_LLM_HEDGE_PERCENTILE", "0"))
+
+        # --- Connections are pooled per (base_url, api_key) across agents; see llm_clients ---
+        self.registry = (registry if registry is not None else get_client_registry()) if LLM_AVAILABLE else None
+        if self.registry is not None:
+            logger.info("LLM Client configured with model: %s at %s", self.model_name, self.base_url)
+
+    def call(self, system_prompt: str, user_prompt: str, timeout: int = 20, stage: str = "extract") -> Optional[str]:
+        # --- Mock responses are cached under their own key so they never shadow real completions ---
+        cache_key = None
+        if self.cache is not None:
+            model_key = self.model_name if self.registry else f"mock:{self.model_name}"
+            cache_key = make_cache_key(model_key, self.base_url, system_prompt, user_prompt,
+                                       temperature=self.temperature, max_tokens=self.max_tokens)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-    def call(self, system_prompt: str, user_prompt: str, timeout: int = 20) -> Optional[str]:
-        if not self.client:
+        response_text = self._call_uncached(system_prompt, user_prompt, timeout, stage)
+        if cache_key is not None and response_text is not None:
+            self.cache.set(cache_key, response_text)
+        return response_text
+
+    def _call_uncached(self, system_prompt: str, user_prompt: str, timeout: int, stage: str) -> Optional[str]:
+        if self.registry is None:
             logger.warning("LLM client not available. Returning mock response.")
             if "防火墙" in user_prompt:
-                return \'{\"applicable_object\": \"防火墙\", \"constraint_content\": \"耐火极限\", \"value\": 4.0, \"operator\": \">=\"}\'
-            return \'[]\'
+                return '{"applicable_object": "防火墙", "constraint_content": "耐火极限", "value": 4.0, "operator": ">="}'
+            return '[]'
+
+        # --- Rate limiting, retries and the circuit breaker are shared per endpoint; see llm_resilience ---
+        guard = get_endpoint_guard(self.base_url, self.api_key)
+        for attempt in range(self.max_retries + 1):
+            try:
+                guard.breaker.before_call()
+            except CircuitOpenError:
+                guard.count("short_circuited")
+                logger.error("LLM endpoint %s is failing (circuit breaker open). Skipping call.", self.base_url)
+                return None
+            guard.bucket.acquire()
+            guard.count("calls")
+            started = time.monotonic()
+            try:
+                content = self._request_with_hedge(guard, system_prompt, user_prompt, timeout, stage)
+            except Exception as e:
+                status = error_status(e)
+                retry_after = None
+                if status == 429:
+                    retry_after = retry_after_seconds(e)
+                    guard.count("throttled")
+                    guard.bucket.on_throttled(retry_after)
+                if is_retryable(status) and status != 429:
+                    guard.breaker.record_failure()
+                else:
+                    guard.breaker.record_success()
+                if not is_retryable(status) or attempt == self.max_retries:
+                    guard.count("failures")
+                    logger.error("LLM API call failed after %d attempt(s): %s", attempt + 1, e)
+                    return None
+                guard.count("retries")
+                # --- A 429 pauses the shared bucket for Retry-After, so only other errors back off here ---
+                delay = 0.0 if status == 429 else backoff_delay(attempt)
+                logger.warning("LLM API call failed (attempt %d): %s. Retrying in %.1fs.", attempt + 1, e, delay)
+                time.sleep(delay)
+                continue
+            guard.breaker.record_success()
+            guard.bucket.on_success()
+            guard.latency.record(time.monotonic() - started)
+            return content
+        return None
 
+    def _request_with_hedge(self, guard: EndpointGuard, system_prompt: str, user_prompt: str, timeout: int, stage: str) -> Optional[str]:
+        """Sends the request; if it runs past the endpoint's latency percentile, races a duplicate against it."""
+        threshold = guard.latency.percentile(self.hedge_percentile) if self.hedge_percentile > 0 else None
+        if threshold is None:
+            return self._request(system_prompt, user_prompt, timeout, stage)
+        pool = _get_hedge_pool()
+        primary = pool.submit(contextvars.copy_context().run, self._request, system_prompt, user_prompt, timeout, stage)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=1024,
-                timeout=timeout
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"LLM API call failed: {e}")
-            return None
+            return primary.result(timeout=threshold)
+        except FutureTimeoutError:
+            pass
+        if not guard.bucket.try_acquire():
+            return primary.result()
+        guard.count("hedged")
+        pending = {primary, pool.submit(contextvars.copy_context().run, self._request, system_prompt, user_prompt, timeout, stage)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _request(self, system_prompt: str, user_prompt: str, timeout: int, stage: str) -> Optional[str]:
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            with self.registry.lease(self.base_url, self.api_key) as client:
+                response = client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    timeout=timeout
+                )
+            outcome = "success"
+        finally:
+            metrics.LLM_CALL_DURATION.observe(time.monotonic() - started, stage=stage, model=self.model_name, outcome=outcome)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, stage=stage, model=self.model_name, kind="prompt")
+            metrics.LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, stage=stage, model=self.model_name, kind="completion")
+        return response.choices[0].message.content
+
+# --- Cache counters are exported at scrape time; a scrape never opens the cache itself ---
+def _cache_metrics(rate: bool = False) -> Dict[tuple, float]:
+    cache = peek_default_cache()
+    if cache is None:
+        return {}
+    return {(): cache.hit_rate()} if rate else {(event,): count for event, count in cache.stats.items()}
+
+metrics.LLM_CACHE_EVENTS.set_function(_cache_metrics)
+metrics.LLM_CACHE_HIT_RATE.set_function(lambda: _cache_metrics(rate=True))
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_LLM_HEDGE_WORKERS", "64")), thread_name_prefix="llm-hedge")
+        return _hedge_pool
 
 # --- Core Agent Logic ---
 class ExtractionAgentFinal:
-    def __init__(self, document_path: str, llm_base_url: Optional[str] = None, llm_model_name: Optional[str] = None, llm_api_key: Optional[str] = None):
+    def __init__(self, document_path: str, llm_base_url: Optional[str] = None, llm_model_name: Optional[str] = None, llm_api_key: Optional[str] = None,
+                 max_concurrency: Optional[int] = None, batch_token_budget: Optional[int] = None,
+                 multi_goal: Optional[bool] = None, streaming: Optional[bool] = None, chunker: Optional[str] = None,
+                 incremental: Optional[bool] = None, document_key: Optional[str] = None,
+                 task_id: Optional[str] = None, user_id: Optional[str] = None, checkpoint: Optional[bool] = None,
+                 relevance_filter: Optional[bool] = None):
         self.state = AgentState.INIT
         self.document_path = document_path
         self.llm_client = LLMClient(base_url=llm_base_url, model_name=llm_model_name, api_key=llm_api_key)
+        # --- Max number of LLM requests in flight during EXTRACTION (1 = sequential) ---
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("AGENT_MAX_CONCURRENCY", "4")))
+        # --- Token budget for packing several chunks into one extraction prompt (0 = one chunk per prompt) ---
+        self.batch_token_budget = batch_token_budget if batch_token_budget is not None else int(os.getenv("AGENT_BATCH_TOKEN_BUDGET", "0"))
+        # --- Ask for all goals matched by a chunk in a single request instead of one request per goal ---
+        self.multi_goal = multi_goal if multi_goal is not None else os.getenv("AGENT_MULTI_GOAL_EXTRACTION", "0") == "1"
+        # --- Memory-map the document and chunk it lazily during EXTRACTION instead of loading it whole ---
+        self.streaming = streaming if streaming is not None else os.getenv("AGENT_STREAMING_INGEST", "0") == "1"
+        # --- "blank_line" splits on empty lines; "clause" splits on clause numbers and tables, capped at max_chunk_tokens ---
+        self.chunker = chunker or os.getenv("AGENT_CHUNKER", "blank_line")
+        self.max_chunk_tokens = int(os.getenv("AGENT_MAX_CHUNK_TOKENS", "800"))
+        # --- REPAIR packs failed items from the same source into one request, up to this many tokens ---
+        self.repair_token_budget = int(os.getenv("AGENT_REPAIR_TOKEN_BUDGET", "2000"))
+        self.max_repair_retries = int(os.getenv("AGENT_MAX_REPAIR_RETRIES", "1"))
+        # --- Reuse stored items for chunks whose content hash is unchanged since an earlier run/revision ---
+        self.incremental = incremental if incremental is not None else os.getenv("AGENT_INCREMENTAL", "0") == "1"
+        self.document_key = document_key or document_path
+        # --- RELEVANCE state: route chunks by BM25 score against goal descriptions instead of by keyword hits ---
+        self.relevance_filter = relevance_filter if relevance_filter is not None else os.getenv("AGENT_RELEVANCE_FILTER", "0") == "1"
+        # --- A chunk is kept for a goal when it scores at least this fraction of the goal's best chunk; at most top_k per goal (0 = no cap) ---
+        self.relevance_threshold = float(os.getenv("AGENT_RELEVANCE_THRESHOLD", "0.15"))
+        self.relevance_top_k = int(os.getenv("AGENT_RELEVANCE_TOP_K", "0"))
+        self.relevance_min_score = float(os.getenv("AGENT_RELEVANCE_MIN_SCORE", "0.03"))
+        # --- Attached to every log record emitted during run() ---
+        self.task_id = task_id
+        self.user_id = user_id
+        # --- Journal states and LLM outputs under task_id, so a rerun of the same task resumes instead of starting over ---
+        self.checkpoint = checkpoint if checkpoint is not None else os.getenv("AGENT_CHECKPOINT", "0") == "1"
+        if self.checkpoint and not task_id:
+            logger.warning("Checkpointing needs a task_id; this run will not be checkpointed.")
+            self.checkpoint = False
+        self._checkpoint_store = get_checkpoint_store() if self.checkpoint else None
+        self._checkpoint_fingerprint: Optional[str] = None
+        self._journal: Dict[str, str] = {}
+        self.resumed_llm_calls = 0
         self.document_content: Optional[str] = None
-        self.document_chunks: List[Dict] = []
+        self.document_chunks: List[Chunk] = []
         self.extraction_goals: List[Dict] = []
+        self.keyword_hits: Dict[str, List[str]] = {}
+        self._relevance_routes: Optional[Dict[str, List[str]]] = None  # chunk id -> goal ids, set by RELEVANCE
+        self.relevance_stats: Optional[Dict[str, Any]] = None
         self.extraction_results: List[ExtractionResult] = []
         self.validated_items: List[Dict] = []
         self.failed_items: List[Dict] = []
-        self.final_output: Optional[str] = None
+        self.repair_stats = {"local_repaired_items": 0, "llm_repaired_items": 0, "llm_repair_calls": 0, "discarded_items": 0}
+        self.llm_call_failures = 0
+        self._source_chunks: Optional[Dict[str, Chunk]] = None
+        self._chunk_hashes: Dict[str, Optional[str]] = {}  # source_ref -> chunk hash (None when the ref is ambiguous)
+        self._reused_hashes: set = set()
+        self._incomplete_refs: set = set()
+        # --- Receives (event, data) while run_in_stream() is active ---
+        self._event_sink: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self.final_result: Optional[Dict[str, Any]] = None
         self.error_message: Optional[str] = None
-        logger.info(f"Agent v2.6 initialized for document: {document_path}")
+        self._state_entered_at = time.monotonic()
+        logger.info("Agent v2.6 initialized for document: %s", document_path)
 
     def _set_state(self, new_state: AgentState):
         if self.state != new_state:
-            logger.info(f"STATE TRANSITION: {self.state.name} -> {new_state.name}")
+            logger.info("STATE TRANSITION: %s -> %s", self.state.name, new_state.name)
+            now = time.monotonic()
+            metrics.STATE_DURATION.observe(now - self._state_entered_at, state=self.state.name)
+            self._state_entered_at = now
             self.state = new_state
+            if self._checkpoint_store is not None:
+                done = new_state == AgentState.DONE and self.error_message is None
+                self._checkpoint_store.save_state(self.task_id, new_state.name, self._checkpoint_fingerprint,
+                                                 serialization.dumps(self.final_result) if done else None)
+            self._emit("status_update", {"status": new_state.name})
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        if self._event_sink is not None:
+            self._event_sink(event, data)
 
     def _ingest_document(self):
         try:
-            with open(self.document_path, \'r\', encoding=\'utf-8\') as f:
+            if self.streaming:
+                size = os.path.getsize(self.document_path)
+                logger.info("Document opened for streaming ingestion (%d bytes).", size)
+                self._set_state(AgentState.STRUCTURE_ANALYSIS)
+                return
+            with open(self.document_path, 'r', encoding='utf-8') as f:
                 self.document_content = f.read()
-            logger.info(f"Document ingested successfully ({len(self.document_content)} chars).")
+            logger.info("Document ingested successfully (%d chars).", len(self.document_content))
             self._set_state(AgentState.STRUCTURE_ANALYSIS)
         except Exception as e:
             self.error_message = f"Document ingestion failed: {e}"
             self._set_state(AgentState.ERROR)
 
     def _analyze_structure(self):
-        sections = self.document_content.split(\'\n\n\')
-        for i, section in enumerate(sections):
-            if len(section.strip()) > 50:
-                self.document_chunks.append({
-                    "id": f"chunk_{i}",
-                    "source_ref": section.split(\'\n\')[0][:70],
-                    "text": section
-                })
-        logger.info(f"Document structure analyzed into {len(self.document_chunks)} chunks.")
+        if self.streaming:
+            logger.info("Streaming mode: chunks are produced on demand during extraction.")
+            self._set_state(AgentState.PLANNING)
+            return
+        if self.chunker == "clause":
+            self.document_chunks = list(iter_clause_chunks(self.document_content.splitlines(), self.max_chunk_tokens))
+            logger.info("Document structure analyzed into %d clause/table chunks.", len(self.document_chunks))
+            self._set_state(AgentState.PLANNING)
+            return
+        # --- Chunks are offsets into document_content; no section text is copied ---
+        self.document_chunks = split_blank_line_chunks(self.document_content)
+        logger.info("Document structure analyzed into %d chunks.", len(self.document_chunks))
         self._set_state(AgentState.PLANNING)
 
     def _plan_extraction(self):
         self.extraction_goals = [
-            {"id": "goal_firewall", "name": "Fire-resistance", "keywords": ["防火墙", "耐火极限"]},
-            {"id": "goal_distance", "name": "Fire safety distance", "keywords": ["防火间距"]},
-            {"id": "goal_materials", "name": "Building materials", "keywords": ["材料", "燃烧性能"]}
+            {"id": "goal_firewall", "name": "Fire-resistance", "keywords": ["防火墙", "耐火极限"],
+             "description": "防火墙、防火隔墙、承重墙、柱、梁、楼板等建筑构件的耐火极限和耐火等级要求"},
+            {"id": "goal_distance", "name": "Fire safety distance", "keywords": ["防火间距"],
+             "description": "建筑之间、建筑与其他设施之间的防火间距要求"},
+            {"id": "goal_materials", "name": "Building materials", "keywords": ["材料", "燃烧性能"],
+             "description": "建筑材料、装修材料和保温材料的燃烧性能等级要求"}
         ]
-        logger.info(f"Extraction plan created with {len(self.extraction_goals)} goals.")
+        logger.info("Extraction plan created with %d goals.", len(self.extraction_goals))
+        if self.relevance_filter and self.streaming:
+            logger.warning("The relevance filter needs the whole document; streaming mode routes by keywords only.")
+        self._set_state(AgentState.RELEVANCE if self.relevance_filter and not self.streaming else AgentState.EXTRACTION)
+
+    def _score_relevance(self):
+        """Ranks every chunk for every goal locally and keeps the best-scoring ones; no LLM call is made."""
+        self._relevance_routes, selected = route_by_relevance(self.extraction_goals, self.document_chunks,
+                                                              self.relevance_threshold, self.relevance_top_k,
+                                                              self.relevance_min_score)
+        self.relevance_stats = {"threshold": self.relevance_threshold, "top_k": self.relevance_top_k,
+                                "min_score": self.relevance_min_score,
+                                "chunks": len(self.document_chunks), "selected_chunks": selected}
+        logger.info("Relevance scoring kept %d of %d chunks (%s).", len(self._relevance_routes), len(self.document_chunks),
+                    ", ".join(f"{gid}: {count}" for gid, count in selected.items()))
         self._set_state(AgentState.EXTRACTION)
 
     def _extract(self):
-        system_prompt = f\"\"\"You are an expert extraction AI. Extract constraints from the text based on the user\\'s goal. Return ONLY a valid JSON array of objects matching this schema: {json.dumps(OUTPUT_SCHEMA)}. If no constraints are found, return an empty array [].\"\"\"
-        
-        for goal in self.extraction_goals:
-            relevant_chunks = [c for c in self.document_chunks if any(kw in c[\'text\'] for kw in goal[\'keywords\'])]
-            for chunk in relevant_chunks:
-                user_prompt = f"Extract constraints for \'{goal[\'name\']}\' from this text:\n\n{chunk[\'text\']}"
-                raw_output = self.llm_client.call(system_prompt, user_prompt)
-                self.extraction_results.append(ExtractionResult(raw_text=raw_output, source_ref=chunk[\'source_ref\'], goal_id=goal[\'id\']))
+        system_prompt = EXTRACTION_SYSTEM_PROMPT
+
+        index = KeywordIndex(self.extraction_goals)
+        tasks = self._iter_streaming_tasks(system_prompt, index) if self.streaming else self._plan_extraction_tasks(system_prompt, index)
+
+        # --- Results keep task order regardless of completion order ---
+        result_count = 0
+        for result, raw_output in self._iter_llm_results(tasks):
+            result.raw_text = raw_output
+            result_count += 1
+            if raw_output is None:
+                # --- Retries are exhausted or the endpoint's breaker is open; the run must not report full success ---
+                result.error = "LLM call failed"
+                self.llm_call_failures += 1
+                self._incomplete_refs.update(result.chunk_refs.values() if result.chunk_refs else [result.source_ref])
+            if self._event_sink is not None:
+                # --- Streaming clients get each chunk's items as soon as its response validates ---
+                self.failed_items.extend(self._validate_results([result]))
+            else:
+                self.extraction_results.append(result)
         
-        logger.info(f"Extraction phase complete. {len(self.extraction_results)} raw results obtained.")
+        logger.info("Extraction phase complete. %d raw results obtained.", result_count)
         self._set_state(AgentState.VALIDATION)
 
-    def _validate(self):
-        newly_failed = []
-        while self.extraction_results:
-            result = self.extraction_results.pop(0)
-            try:
-                if not result.raw_text or not result.raw_text.strip():
-                    continue
+    def _plan_extraction_tasks(self, system_prompt: str, index: KeywordIndex) -> List[tuple]:
+        chunks = self._skip_unchanged_chunks(self.document_chunks) if self.incremental else self.document_chunks
 
-                parsed = json.loads(result.raw_text)
-                
-                if not isinstance(parsed, list):
-                    raise TypeError("LLM output is not a JSON array.")
+        # --- Route every goal with one keyword-automaton pass over the chunks ---
+        chunk_goals, self.keyword_hits = index.route(chunks)
+        logger.info("Goal routing matched %d of %d chunks.", len(chunk_goals), len(chunks))
 
-                for item in parsed:
-                    is_valid, errors = self._validate_item_schema(item)
-                    if is_valid:
-                        item[\'source_ref\'] = result.source_ref
-                        self.validated_items.append(item)
-                    else:
-                        newly_failed.append({"item": item, "errors": errors, "source_ref": result.source_ref, "retry_count": 0})
-                        logger.warning(f"Schema validation failed for item from \'{result.source_ref}\'. Errors: {errors}")
+        if self._relevance_routes is not None:
+            keyword_calls = sum(len(self._pack_chunks(unit_chunks)) for _, unit_chunks in self._work_units(chunks, chunk_goals))
+            self._compare_routes(chunks, chunk_goals)
+            chunk_goals = self._relevance_routes
 
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.warning(f"JSON parsing/validation failed for result from \'{result.source_ref}\'. Error: {e}")
-                newly_failed.append({"raw_text": result.raw_text, "errors": [str(e)], "source_ref": result.source_ref, "retry_count": 0})
+        tasks = []
+        for goals, relevant_chunks in self._work_units(chunks, chunk_goals):
+            for batch in self._pack_chunks(relevant_chunks):
+                tasks.append(self._build_extraction_task(system_prompt, goals, batch))
+
+        if self._relevance_routes is not None:
+            skipped = keyword_calls - len(tasks)
+            self.relevance_stats.update(keyword_calls=keyword_calls, calls=len(tasks), skipped_calls=skipped)
+            # --- Runs where the scorer added calls are counted separately, so the skipped counter is not offset by them ---
+            if skipped >= 0:
+                metrics.RELEVANCE_SKIPPED_CALLS.inc(skipped)
+            else:
+                metrics.RELEVANCE_ADDED_CALLS.inc(-skipped)
+            logger.info("Relevance filter: %d extraction calls instead of %d with keyword routing (%d skipped).",
+                        len(tasks), keyword_calls, skipped)
+        return tasks
+
+    def _compare_routes(self, chunks: List[Chunk], keyword_goals: Dict[str, List[str]]):
+        """Counts the (chunk, goal) pairs the relevance filter dropped from, and added to, the keyword routes."""
+        dropped = added = 0
+        for chunk in chunks:
+            by_keyword = set(keyword_goals.get(chunk.id, ()))
+            by_score = set(self._relevance_routes.get(chunk.id, ()))
+            dropped += len(by_keyword - by_score)
+            added += len(by_score - by_keyword)
+        self.relevance_stats.update(dropped_keyword_pairs=dropped, added_pairs=added)
+
+    def _work_units(self, chunks: List[Chunk], chunk_goals: Dict[str, List[str]]) -> List[Tuple[List[Dict], List[Chunk]]]:
+        """Work units are (goals, chunks): one goal per unit by default, every matched goal per chunk in multi-goal mode."""
+        goals_by_id = {g['id']: g for g in self.extraction_goals}
+        if self.multi_goal:
+            goal_groups: Dict[tuple, List[Chunk]] = {}
+            for chunk in chunks:
+                matched = tuple(chunk_goals.get(chunk.id, ()))
+                if matched:
+                    goal_groups.setdefault(matched, []).append(chunk)
+            units = [([goals_by_id[gid] for gid in goal_ids], chunks) for goal_ids, chunks in goal_groups.items()]
+        else:
+            goal_chunks: Dict[str, List[Chunk]] = {gid: [] for gid in goals_by_id}
+            for chunk in chunks:
+                for gid in chunk_goals.get(chunk.id, ()):
+                    goal_chunks[gid].append(chunk)
+            units = [([goal], goal_chunks[goal['id']]) for goal in self.extraction_goals]
+        return units
+
+    def _iter_streaming_tasks(self, system_prompt: str, index: KeywordIndex) -> Iterator[tuple]:
+        """Yields extraction tasks while the document is still being chunked; only open batches are held in memory."""
+        goals_by_id = {g['id']: g for g in self.extraction_goals}
+        packers: Dict[tuple, ChunkPacker] = {}
+        chunk_count = 0
+        for chunk in self._iter_document_chunks():
+            chunk_count += 1
+            if self.incremental and not self._skip_unchanged_chunks([chunk]):
+                continue
+            keywords = index.match(chunk.text)
+            if not keywords:
+                continue
+            self.keyword_hits[chunk.id] = sorted(keywords)
+            goal_ids = index.goals_for(keywords)
+            for key in ([tuple(goal_ids)] if self.multi_goal else [(gid,) for gid in goal_ids]):
+                packer = packers.setdefault(key, ChunkPacker(self.batch_token_budget))
+                batch = packer.add(chunk)
+                if batch:
+                    yield self._build_extraction_task(system_prompt, [goals_by_id[gid] for gid in key], batch)
+        for key, packer in packers.items():
+            batch = packer.flush()
+            if batch:
+                yield self._build_extraction_task(system_prompt, [goals_by_id[gid] for gid in key], batch)
+        logger.info("Streaming structure analysis produced %d chunks; %d matched a goal.", chunk_count, len(self.keyword_hits))
+
+    def _skip_unchanged_chunks(self, chunks: List[Chunk]) -> List[Chunk]:
+        """Reuses stored items for chunks seen before under the same configuration; returns the chunks that still need extraction."""
+        if not hasattr(self, '_hash_salt'):
+            self._hash_salt = hashlib.sha256(json.dumps({
+                "model": self.llm_client.model_name, "goals": self.extraction_goals, "chunker": self.chunker,
+                "max_chunk_tokens": self.max_chunk_tokens, "schema": OUTPUT_SCHEMA,
+                **({"relevance": [self.relevance_threshold, self.relevance_top_k, self.relevance_min_score]} if self.relevance_filter else {})
+            }, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+        hashes = []
+        for chunk in chunks:
+            ref = chunk.source_ref
+            h = chunk_hash(self._hash_salt, chunk.text)
+            # --- Items are attributed to chunks by source_ref, so a repeated ref cannot be cached safely ---
+            self._chunk_hashes[ref] = None if ref in self._chunk_hashes else h
+            hashes.append(self._chunk_hashes[ref])
+
+        stored = get_chunk_store().get_items(h for h in hashes if h)
+        remaining = []
+        for chunk, h in zip(chunks, hashes):
+            if h not in stored:
+                remaining.append(chunk)
+                continue
+            self._reused_hashes.add(h)
+            reused = [{**item, "source_ref": chunk.source_ref} for item in stored[h]]
+            self.validated_items.extend(reused)
+            if reused:
+                self._emit("items", {"source_ref": chunk.source_ref, "goal_id": None, "items": [dict(i) for i in reused], "reused": True})
+        return remaining
+
+    def _record_revision(self) -> Dict[str, Any]:
+        """Stores this run's per-chunk items and diffs its constraints against the document's previous revision."""
+        store = get_chunk_store()
+        items_by_ref: Dict[str, List[Dict]] = {}
+        for item in self.validated_items:
+            items_by_ref.setdefault(item['source_ref'], []).append(item)
+        store.put_items({
+            h: items_by_ref.get(ref, []) for ref, h in self._chunk_hashes.items()
+            if h and h not in self._reused_hashes and ref not in self._incomplete_refs
+        })
+
+        previous_hashes = store.get_revision(self.document_key)
+        # --- Previous revision's items by fingerprint, so removed constraints can be returned, not just counted ---
+        previous_items: Dict[str, List[Dict]] = {}
+        if previous_hashes is not None:
+            for items in store.get_items(previous_hashes).values():
+                for i in items:
+                    previous_items.setdefault(constraint_fingerprint({k: v for k, v in i.items() if k != 'source_ref'}), []).append(i)
+        previous = Counter({fp: len(items) for fp, items in previous_items.items()})
+        store.put_revision(self.document_key, [h for h in self._chunk_hashes.values() if h])
+
+        current, added = Counter(), []
+        for item in self.validated_items:
+            fp = constraint_fingerprint({k: v for k, v in item.items() if k != 'source_ref'})
+            current[fp] += 1
+            if current[fp] > previous[fp]:
+                added.append(item)
+        removed = [
+            {**item, "fingerprint": fp}
+            for fp, surplus in (previous - current).items()
+            for item in previous_items[fp][-surplus:]
+        ]
+        return {
+            "previous_revision_found": previous_hashes is not None,
+            "added": added,
+            "removed": removed,
+            "removed_count": len(removed),
+            "unchanged_count": len(self.validated_items) - len(added),
+            "reused_chunks": len(self._reused_hashes),
+            "extracted_chunks": sum(1 for h in self._chunk_hashes.values() if h not in self._reused_hashes),
+        }
+
+    def _iter_document_chunks(self) -> Iterator[Chunk]:
+        if self.chunker == "clause":
+            with open(self.document_path, 'r', encoding='utf-8', errors='replace') as f:
+                yield from iter_clause_chunks(f, self.max_chunk_tokens)
+        else:
+            yield from iter_blank_line_chunks(self.document_path)
+
+    def _build_extraction_task(self, system_prompt: str, goals: List[Dict], batch: List[Chunk]) -> tuple:
+        """Returns (system_prompt, user_prompt, pending ExtractionResult) for one group of goals over one batch of chunks."""
+        result = ExtractionResult(raw_text=None, source_ref=batch[0].source_ref, goal_id=goals[0]['id'])
+
+        if self.multi_goal:
+            result.goal_ids = [g['id'] for g in goals]
+            goal_list = ", ".join(f"{g['id']} ('{g['name']}')" for g in goals)
+            system_prompt += """ The user lists several goals by id. Add a "goal_id" field to every object holding the id of the goal it satisfies."""
+            goal_desc = f"the goals {goal_list}"
+        else:
+            goal_desc = f"'{goals[0]['name']}'"
+
+        if len(batch) == 1:
+            user_prompt = f"Extract constraints for {goal_desc} from this text:\n\n{batch[0].text}"
+        else:
+            result.chunk_refs = {c.id: c.source_ref for c in batch}
+            system_prompt += """ The text is split into chunks, each introduced by a tag line such as [[chunk_3]]. Add a "chunk_id" field to every object holding the tag of the chunk it was extracted from."""
+            tagged_text = "\n\n".join(f"[[{c.id}]]\n{c.text}" for c in batch)
+            user_prompt = f"Extract constraints for {goal_desc} from these text chunks:\n\n{tagged_text}"
+        return system_prompt, user_prompt, result
+
+    def _pack_chunks(self, chunks: List[Chunk]) -> List[List[Chunk]]:
+        """Greedily groups consecutive chunks so each group stays within `batch_token_budget`."""
+        packer = ChunkPacker(self.batch_token_budget)
+        batches = [batch for batch in map(packer.add, chunks) if batch]
+        last = packer.flush()
+        return batches + [last] if last else batches
+
+    def _iter_llm_results(self, tasks: Iterable[tuple], stage: str = "extract") -> Iterator[Tuple[Any, Optional[str]]]:
+        """
+        Runs (system_prompt, user_prompt, payload) tasks with at most `max_concurrency` calls in flight.
+
+        Yields (payload, output) pairs in task order as soon as each is available. `tasks` may be a
+        generator; it is consumed lazily and only a small window of submitted prompts is held at a time.
+        """
+        if self.max_concurrency <= 1:
+            for system_prompt, user_prompt, payload in tasks:
+                yield payload, self._call_llm(system_prompt, user_prompt, stage)
+            return
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm") as pool:
+            for system_prompt, user_prompt, payload in tasks:
+                # --- Each worker call runs in a copy of this context so its log records keep the task_id/user_id ---
+                in_flight.append((payload, pool.submit(contextvars.copy_context().run, self._call_llm, system_prompt, user_prompt, stage)))
+                while len(in_flight) >= 2 * self.max_concurrency:
+                    payload, future = in_flight.popleft()
+                    yield payload, future.result()
+            while in_flight:
+                payload, future = in_flight.popleft()
+                yield payload, future.result()
+
+    def _call_llm(self, system_prompt: str, user_prompt: str, stage: str) -> Optional[str]:
+        """Calls the LLM, answering from the checkpoint journal when a previous attempt of this task already made the call."""
+        if self._checkpoint_store is None:
+            return self.llm_client.call(system_prompt, user_prompt, stage=stage)
+        key = make_cache_key(self.llm_client.model_name, self.llm_client.base_url, system_prompt, user_prompt, stage=stage)
+        output = self._journal.get(key)
+        if output is not None:
+            self.resumed_llm_calls += 1
+            return output
+        output = self.llm_client.call(system_prompt, user_prompt, stage=stage)
+        if output is not None:
+            self._checkpoint_store.record_call(self.task_id, key, output)
+        return output
+
+    def _validate(self):
+        results, self.extraction_results = self.extraction_results, []
+        newly_failed = self._validate_results(results)
 
         if newly_failed:
             self.failed_items.extend(newly_failed)
 
         if self.failed_items:
-            logger.info(f"{len(self.failed_items)} items failed validation. Entering REPAIR state.")
+            logger.info("%d items failed validation. Entering REPAIR state.", len(self.failed_items))
             self._set_state(AgentState.REPAIR)
         else:
             logger.info("All items validated successfully.")
             self._set_state(AgentState.FINALIZE)
 
-    def _validate_item_schema(self, item: Dict) -> tuple[bool, List[str]]:
+    def _validate_results(self, results: List[ExtractionResult]) -> List[Dict]:
+        """Validates raw results into `validated_items`; returns the failed entries for REPAIR."""
+        newly_failed = []
+        for result in results:
+            validated_count = len(self.validated_items)
+            try:
+                if not result.raw_text or not result.raw_text.strip():
+                    continue
+
+                # --- Local repair stage: fences, bare objects and trailing commas are fixed without an LLM call ---
+                parsed, text_fixes = parse_llm_json(result.raw_text)
+
+                for item, errors in zip(parsed, self._validate_items(parsed)):
+                    source_ref, tag_errors = self._resolve_item_tags(item, result)
+                    item_fixes = []
+                    if errors and isinstance(item, dict):
+                        item_fixes = repair_item(item, source_ref, self._source_text(source_ref))
+                        if item_fixes:
+                            errors = self._validate_items([item])[0]
+                    errors += tag_errors
+                    if not errors:
+                        item.pop('chunk_id', None)
+                        item['source_ref'] = source_ref
+                        _intern_fields(item)
+                        self.validated_items.append(item)
+                        if result.goal_id == 'repair':
+                            self.repair_stats["llm_repaired_items"] += 1
+                            metrics.REPAIR_ITEMS.inc(outcome="llm_repaired")
+                        elif text_fixes or item_fixes:
+                            self.repair_stats["local_repaired_items"] += 1
+                            metrics.REPAIR_ITEMS.inc(outcome="local_repaired")
+                    else:
+                        newly_failed.append({"item": item, "errors": errors, "source_ref": source_ref, "retry_count": result.retry_count, "chunk_refs": result.chunk_refs, "goal_ids": result.goal_ids})
+                        logger.warning("Schema validation failed for item from '%s'. Errors: %s", source_ref, errors)
+
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning("JSON parsing/validation failed for result from '%s'. Error: %s", result.source_ref, e)
+                newly_failed.append({"raw_text": result.raw_text, "errors": [str(e)], "source_ref": result.source_ref, "retry_count": result.retry_count, "chunk_refs": result.chunk_refs, "goal_ids": result.goal_ids})
+
+            if self._event_sink is not None and len(self.validated_items) > validated_count:
+                self._emit("items", {"source_ref": result.source_ref, "goal_id": result.goal_id, "items": [dict(item) for item in self.validated_items[validated_count:]]})
+        return newly_failed
+
+    def _resolve_item_tags(self, item: Any, result: ExtractionResult) -> Tuple[str, List[str]]:
+        """Maps an item's chunk/goal tags back to its source_ref and goal; returns (source_ref, tag errors)."""
         errors = []
-        for field in OUTPUT_SCHEMA[\'required\']:
-            if field not in item or not item.get(field):
-                errors.append(f"Missing required field: \'{field}\'")
-        if \'value\' in item and isinstance(item[\'value\'], (int, float)) and not item.get(\'unit\'):
-            errors.append("Numeric \'value\' requires a \'unit\'.")
-        return len(errors) == 0, errors
+        source_ref = result.source_ref
+        if not isinstance(item, dict):
+            return source_ref, errors
+        if result.goal_ids is not None:
+            if len(result.goal_ids) == 1:
+                item.setdefault('goal_id', result.goal_ids[0])
+            if item.get('goal_id') not in result.goal_ids:
+                errors.append(f"$.goal_id: Missing or unknown goal id; expected one of {result.goal_ids}")
+        if result.chunk_refs is not None:
+            mapped = result.chunk_refs.get(item.get('chunk_id'))
+            if mapped is None:
+                errors.append(f"$.chunk_id: Missing or unknown chunk tag; expected one of {list(result.chunk_refs)}")
+            else:
+                source_ref = mapped
+        return source_ref, errors
+
+    def _source_text(self, source_ref: str) -> Optional[str]:
+        """Chunk text for a source_ref, used by local repair; unavailable in streaming mode."""
+        if self._source_chunks is None:
+            self._source_chunks = {c.source_ref: c for c in self.document_chunks}
+        chunk = self._source_chunks.get(source_ref)
+        return chunk.text if chunk is not None else None
+
+    def _validate_items(self, items: List[Any]) -> List[List[str]]:
+        """Validates a batch of items against the compiled schema plus the unit rule; one error list per item."""
+        batch_errors = ITEM_VALIDATOR.validate_batch(items)
+        for item, errors in zip(items, batch_errors):
+            if isinstance(item, dict) and type(item.get('value')) in (int, float) and not item.get('unit'):
+                errors.append("$.unit: Numeric 'value' requires a 'unit'.")
+        return batch_errors
 
     def _repair(self):
-        max_retries = 1
         items_to_retry = self.failed_items
         self.failed_items = []
 
-        system_prompt = f\"\"\"You are a JSON repair expert. Correct the provided JSON based on the error description and schema. Return ONLY the corrected, valid JSON array. Schema: {json.dumps(OUTPUT_SCHEMA)}\"\"\"
+        system_prompt = REPAIR_SYSTEM_PROMPT
 
+        # --- Group by source (and tag context) so one request repairs every failed item of a chunk ---
+        groups: Dict[tuple, List[Dict]] = {}
         for failed in items_to_retry:
-            if failed[\'retry_count\'] >= max_retries:
-                logger.error(f"Max retries exceeded for item from \'{failed[\'source_ref\']}\'. Discarding.")
+            if failed['retry_count'] >= self.max_repair_retries:
+                logger.error("Max retries exceeded for item from '%s'. Discarding.", failed['source_ref'])
+                self.repair_stats["discarded_items"] += 1
+                metrics.REPAIR_ITEMS.inc(outcome="discarded")
+                self._incomplete_refs.add(failed['source_ref'])
+                self._emit("repair", {"source_ref": failed['source_ref'], "outcome": "discarded", "errors": failed['errors']})
                 continue
+            key = (failed['source_ref'], tuple(failed.get('goal_ids') or ()), tuple(failed.get('chunk_refs') or ()))
+            groups.setdefault(key, []).append(failed)
+
+        tasks = []
+        for group in groups.values():
+            for batch in self._pack_repair_batch(group):
+                entries = "\n\n".join(f"[{i}] Errors: {'; '.join(f['errors'])}\nInvalid JSON: {self._repair_payload(f)}" for i, f in enumerate(batch))
+                user_prompt = f"The following JSON inputs are invalid. Please fix them.\n\n{entries}"
+                logger.info("Attempting to repair %d item(s) from '%s' (Attempt %d)", len(batch), batch[0]['source_ref'], batch[0]['retry_count'] + 1)
+                tasks.append((system_prompt, user_prompt, batch))
 
-            error_desc = "; ".join(failed[\'errors\'])
-            original_data = failed.get(\'raw_text\') or json.dumps(failed.get(\'item\'))
-            user_prompt = f"The following JSON is invalid. Please fix it.\nErrors: {error_desc}\nInvalid JSON: {original_data}"
-            
-            logger.info(f"Attempting to repair item from \'{failed[\'source_ref\']}\' (Attempt {failed[\'retry_count\'] + 1})")
-            repaired_output = self.llm_client.call(system_prompt, user_prompt)
-            
-            self.extraction_results.append(ExtractionResult(raw_text=repaired_output, source_ref=failed[\'source_ref\'], goal_id=\'repair\'))
+        self.repair_stats["llm_repair_calls"] += len(tasks)
+        for batch, repaired_output in self._iter_llm_results(tasks, stage="repair"):
+            mapped = self._map_repaired_output(repaired_output, len(batch))
+            self._emit("repair", {"source_ref": batch[0]['source_ref'], "outcome": "answered", "attempt": batch[0]['retry_count'] + 1,
+                                  "requested": len(batch), "answered": sum(items is not None for items in mapped)})
+            for failed, items in zip(batch, mapped):
+                if items is None:
+                    # --- Nothing usable came back for this item; it stays failed and counts the attempt ---
+                    self.failed_items.append({**failed, "retry_count": failed['retry_count'] + 1})
+                    continue
+                self.extraction_results.append(ExtractionResult(raw_text=json.dumps(items, ensure_ascii=False), source_ref=failed['source_ref'], goal_id='repair',
+                                                                chunk_refs=failed.get('chunk_refs'), goal_ids=failed.get('goal_ids'), retry_count=failed['retry_count'] + 1))
 
         self._set_state(AgentState.VALIDATION)
 
+    def _repair_payload(self, failed: Dict) -> str:
+        return failed.get('raw_text') or json.dumps(failed.get('item'), ensure_ascii=False)
+
+    def _pack_repair_batch(self, group: List[Dict]) -> List[List[Dict]]:
+        """Splits one source's failed items into batches whose payloads stay within `repair_token_budget`."""
+        batches, current, tokens = [], [], 0
+        for failed in group:
+            item_tokens = estimate_tokens(self._repair_payload(failed)) + estimate_tokens("; ".join(failed['errors'])) + 8
+            if current and tokens + item_tokens > self.repair_token_budget:
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(failed)
+            tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _map_repaired_output(self, raw_output: Optional[str], count: int) -> List[Optional[List[Any]]]:
+        """
+        Maps a batched repair response back to its inputs by index; None marks an input with no usable answer.
+
+        An empty item list counts as no answer, so the input is retried and eventually discarded instead of vanishing.
+        """
+        mapped: List[Optional[List[Any]]] = [None] * count
+        if not raw_output or not raw_output.strip():
+            return mapped
+        try:
+            entries, _ = parse_llm_json(raw_output)
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning("Repair response could not be parsed. Error: %s", e)
+            return mapped
+        indexed = [e for e in entries if isinstance(e, dict) and isinstance(e.get('index'), int) and 'items' in e]
+        if not indexed:
+            # --- A single input may be answered with the corrected objects directly ---
+            if count == 1:
+                mapped[0] = entries or None
+            return mapped
+        for entry in indexed:
+            if 0 <= entry['index'] < count:
+                items = entry['items']
+                mapped[entry['index']] = (items if isinstance(items, list) else [items]) or None
+        return mapped
+
     def _finalize(self):
         final_result = {
-            "status": "completed",
-            "validated_items": [],
-            "failed_items_count": len(self.failed_items)
+            "status": "completed_with_failures" if self.repair_stats["discarded_items"] or self.llm_call_failures else "completed",
+            "validated_items": self.validated_items,
+            "failed_items_count": self.repair_stats["discarded_items"],
+            "llm_call_failures": self.llm_call_failures,
+            "repair_stats": self.repair_stats
+        }
+        if self.checkpoint:
+            final_result["resumed_llm_calls"] = self.resumed_llm_calls
+        if self.relevance_stats is not None:
+            final_result["relevance"] = self.relevance_stats
+        if self.incremental:
+            final_result["revision_diff"] = self._record_revision()
+        # --- One metadata dict per run, referenced by every item rather than copied into each ---
+        extraction_metadata = {
+            "extraction_timestamp": datetime.now().isoformat(),
+            "agent_version": "2.6.0",
+            "confidence_score": 0.98
         }
         for item in self.validated_items:
-            item[\'id\'] = str(uuid.uuid4())
-            item[\'source_document\'] = self.document_path
-            item[\'extraction_metadata\'] = {
-                "extraction_timestamp": datetime.now().isoformat(),
-                "agent_version": "2.6.0",
-                "confidence_score": 0.98
-            }
-            final_result["validated_items"].append(item)
-        self.final_output = json.dumps(final_result, indent=2, ensure_ascii=False)
-        logger.info(f"Finalization complete. {len(self.validated_items)} constraints prepared.")
+            item['id'] = str(uuid.uuid4())
+            item['source_document'] = self.document_path
+            item['extraction_metadata'] = extraction_metadata
+        self.final_result = final_result
+        metrics.RUNS.inc(status=final_result["status"])
+        logger.info("Finalization complete. %d constraints prepared.", len(self.validated_items))
         self._set_state(AgentState.DONE)
 
     def _handle_error(self):
-        logger.error(f"Agent entered ERROR state: {self.error_message}")
-        self.final_output = json.dumps({"error": self.error_message, "status": "failed"}, indent=2)
+        logger.error("Agent entered ERROR state: %s", self.error_message)
+        self.final_result = {"error": self.error_message, "status": "failed"}
+        metrics.RUNS.inc(status="failed")
         self._set_state(AgentState.DONE)
 
-    def run(self):
+    @property
+    def final_output(self) -> Optional[str]:
+        """The final result as indented JSON, encoded on access; servers use `final_result` directly."""
+        return json.dumps(self.final_result, indent=2, ensure_ascii=False) if self.final_result is not None else None
+
+    def run(self) -> Optional[str]:
+        """Runs the agent and returns the final result as indented JSON."""
+        self.run_result()
+        return self.final_output
+
+    def run_result(self) -> Optional[Dict[str, Any]]:
+        """Runs the agent and returns the final result as a dict, with no JSON round trip."""
+        with log_context(task_id=self.task_id, user_id=self.user_id):
+            if self._checkpoint_store is not None and self._resume_checkpoint():
+                return self.final_result
+            return self._run_state_machine()
+
+    def _resume_checkpoint(self) -> bool:
+        """Loads this task's checkpoint; returns True when the task already finished and `final_result` is restored."""
+        self._checkpoint_fingerprint = run_fingerprint(self.document_path, self.user_id, self.llm_client.base_url,
+                                                       self.llm_client.model_name)
+        # --- Raises CheckpointConflictError when the id belongs to another document, user or LLM config ---
+        saved = self._checkpoint_store.load(self.task_id, self._checkpoint_fingerprint)
+        if saved is None:
+            return False
+        state, final_output = saved
+        if final_output is not None:
+            logger.info("Task %s already completed; returning its checkpointed result.", self.task_id)
+            self.final_result = json.loads(final_output)
+            self.state = AgentState.DONE
+            return True
+        self._journal = self._checkpoint_store.load_journal(self.task_id)
+        logger.info("Resuming task %s (last state %s) with %d journaled LLM calls.", self.task_id, state, len(self._journal))
+        return False
+
+    def _run_state_machine(self):
         logger.info("="*50 + " AGENT EXECUTION START " + "="*50)
         state_handlers = {
             AgentState.INIT: lambda: self._set_state(AgentState.DOCUMENT_INGEST),
             AgentState.DOCUMENT_INGEST: self._ingest_document,
             AgentState.STRUCTURE_ANALYSIS: self._analyze_structure,
             AgentState.PLANNING: self._plan_extraction,
+            AgentState.RELEVANCE: self._score_relevance,
             AgentState.EXTRACTION: self._extract,
             AgentState.VALIDATION: self._validate,
             AgentState.REPAIR: self._repair,
@@ -284,4 +945,39 @@ class ExtractionAgentFinal:
             if handler: handler()
             else: self.error_message = f"Unknown state: {self.state}"; self._set_state(AgentState.ERROR)
         logger.info("="*51 + " AGENT EXECUTION END " + "="*51)
-        return self.final_output
+        return self.final_result
+
+    async def run_in_stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs the agent on a worker thread and yields events as they happen.
+
+        Events are dicts with `event` and `data`: `status_update` on every state
+        transition, `items` with each result's validated constraints, `repair` for
+        every repair batch or discarded item, and finally `final_result` carrying
+        the same payload `run()` returns.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        def sink(event: str, data: Dict[str, Any]):
+            loop.call_soon_threadsafe(queue.put_nowait, {"event": event, "data": data})
+
+        def worker():
+            try:
+                return self.run_result()
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        self._event_sink = sink
+        run_future = loop.run_in_executor(None, worker)
+        try:
+            while True:
+                event = await queue.get()
+                if event is finished:
+                    break
+                yield event
+            final_result = await run_future
+        finally:
+            self._event_sink = None
+        yield {"event": "final_result", "data": final_result}
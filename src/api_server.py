@@ -2,17 +2,29 @@
 import os
 import uuid
 import logging
-import json
-from fastapi import FastAPI, HTTPException, Depends, Request
+import asyncio
+import glob
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, Header
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from .agent import ExtractionAgentFinal
 from .billing_decision import decide_billing, REASON_AGENT_FAILURE
+from .task_runner import TaskRunner, TaskStore, QueueFullError
+from .checkpoint_store import CheckpointConflictError
+from .constraint_store import get_constraint_store, MAX_PAGE_SIZE
+from . import metrics
+from .log_config import configure_logging, log_context, shutdown_logging
+from .startup import warm_up
+from . import serialization
+from .serialization import NDJSON_MEDIA_TYPE
 
-# --- Logging Configuration ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 # --- API Key Security ---
 API_KEY_NAME = "X-API-Key"
@@ -26,14 +38,53 @@ async def get_api_key(api_key: str = Depends(api_key_header)):
         raise HTTPException(status_code=401, detail="Invalid API Key")
     return api_key
 
+# --- Logging Configuration ---
+# Installed at startup rather than on import, so importing the package never touches the root logger.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # --- Pay the cold-start cost (SDK import, cache, default client, stores) before the first request ---
+    warm_up()
+    get_task_constraint_store()
+    yield
+    shutdown_logging()
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="Engineering Specification Extraction Agent API",
     description="A task-oriented Agent API for high-reliability structured data extraction.",
     version="2.6.0",
     docs_url="/docs",
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
+)
+
+# --- Worker Pool & Task Registry ---
+# Agent runs are synchronous; they execute on a bounded pool so the event loop (and /health) stays responsive.
+task_runner = TaskRunner(
+    max_workers=int(os.getenv("AGENT_WORKERS", "4")),
+    max_queue=int(os.getenv("AGENT_QUEUE_DEPTH", "16"))
+)
+task_store = TaskStore(ttl_seconds=float(os.getenv("AGENT_TASK_RESULT_TTL", "3600")))
+# Documents of /v1/extract/batch run on their own pool, so one large batch cannot starve single-document requests.
+# Every run shares the process-wide LLM client pool, response cache and rate limiter.
+batch_runner = TaskRunner(
+    max_workers=int(os.getenv("AGENT_BATCH_WORKERS", "8")),
+    max_queue=int(os.getenv("AGENT_BATCH_QUEUE_DEPTH", "32"))
 )
+MAX_BATCH_DOCUMENTS = int(os.getenv("AGENT_BATCH_MAX_DOCUMENTS", "5000"))
+metrics.TASKS_IN_FLIGHT.set_function(lambda: {("api",): task_runner.stats()["running"], ("batch",): batch_runner.stats()["running"]})
+metrics.TASK_QUEUE_DEPTH.set_function(lambda: {("api",): task_runner.stats()["queued"], ("batch",): batch_runner.stats()["queued"]})
+RETRY_AFTER_SECONDS = "5"
+# Client-supplied task ids of synchronous /v1/extract runs in progress (async ones are tracked in task_store).
+# Only touched from the event loop, so check-and-add needs no lock.
+sync_task_ids: set = set()
+
+# --- Constraint Store ---
+# Validated items of completed tasks are persisted here and served by /v1/constraints.
+# Opened on first use in the worker process, so a preforking server never shares the SQLite handle.
+def get_task_constraint_store():
+    return get_constraint_store()
 
 # --- Request & Response Models ---
 class ExtractionRequest(BaseModel):
@@ -43,6 +94,10 @@ class ExtractionRequest(BaseModel):
     llm_base_url: Optional[str] = None
     llm_model_name: Optional[str] = None
     llm_api_key: Optional[str] = None
+    # Revision identity for incremental extraction (defaults to document_path)
+    document_key: Optional[str] = None
+    # Reusing the id of an interrupted task resumes it from its checkpoint (AGENT_CHECKPOINT=1)
+    task_id: Optional[str] = None
 
 class BillingInfo(BaseModel):
     billable: bool
@@ -58,14 +113,29 @@ class ExtractionResponse(BaseModel):
     result: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
 
-# --- API Endpoint ---
-@app.post("/v1/extract", 
-            response_model=ExtractionResponse, 
-            summary="Run a Billable Extraction Task",
-            tags=["Agent API"])
-async def extract_from_document(request: ExtractionRequest, api_key: Optional[str] = Depends(get_api_key)):
-    task_id = f"task_{uuid.uuid4()}"
-    
+class TaskSubmission(BaseModel):
+    task_id: str
+    status: str
+
+class TaskStatus(BaseModel):
+    task_id: str
+    status: str
+    response: Optional[ExtractionResponse] = None
+
+class BatchExtractionRequest(BaseModel):
+    # Explicit paths and/or a directory or glob pattern (e.g. "/data/specs/**/*.txt")
+    document_paths: List[str] = []
+    document_glob: Optional[str] = None
+    user_id: Optional[str] = "default_user"
+    llm_base_url: Optional[str] = None
+    llm_model_name: Optional[str] = None
+    llm_api_key: Optional[str] = None
+
+class ConstraintPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
+
+def _run_extraction_task(task_id: str, request: ExtractionRequest) -> ExtractionResponse:
     if not os.path.exists(request.document_path) or os.path.getsize(request.document_path) == 0:
         return ExtractionResponse(
             task_id=task_id, user_id=request.user_id, document_path=request.document_path,
@@ -74,31 +144,48 @@ async def extract_from_document(request: ExtractionRequest, api_key: Optional[st
             error_message="Document not found or is empty."
         )
 
+    with log_context(task_id=task_id, user_id=request.user_id):
+        return _run_agent(task_id, request)
+
+def _run_agent(task_id: str, request: ExtractionRequest) -> ExtractionResponse:
     try:
-        logging.info(f"Starting Agent task {task_id} for user {request.user_id}")
+        logger.info("Starting Agent task %s for user %s", task_id, request.user_id)
         
         # --- Initialize Agent with dynamic LLM config ---
         agent = ExtractionAgentFinal(
             document_path=request.document_path,
             llm_base_url=request.llm_base_url,
             llm_model_name=request.llm_model_name,
-            llm_api_key=request.llm_api_key
+            llm_api_key=request.llm_api_key,
+            document_key=request.document_key,
+            task_id=task_id,
+            user_id=request.user_id
         )
         
-        final_json_output = agent.run()
+        agent_result = agent.run_result()
         
-        if not final_json_output:
+        if not agent_result:
             raise ValueError("Agent execution failed to produce output.")
-
-        agent_result = json.loads(final_json_output)
         
         billing_info = decide_billing({
             "status": agent_result.get("status", "completed"),
             "validated_count": len(agent_result.get("validated_items", [])),
         })
 
+        constraint_store = get_task_constraint_store()
+        if constraint_store is not None:
+            try:
+                # --- Only a complete run may replace stored constraints; a partial one adds what it found ---
+                items = agent_result.get("validated_items", [])
+                if agent_result.get("status") == "completed":
+                    constraint_store.replace_document(request.document_path, items, task_id=task_id, user_id=request.user_id)
+                elif items:
+                    constraint_store.merge_document(request.document_path, items, task_id=task_id, user_id=request.user_id)
+            except Exception as e:
+                logger.error("Failed to persist constraints of task %s: %s", task_id, e)
+
         if billing_info["billable"]:
-            logging.info(f"BILLABLE_EVENT: Task {task_id} for user {request.user_id}. Reason: {billing_info['reason']}")
+            logger.info("BILLABLE_EVENT: Task %s for user %s. Reason: %s", task_id, request.user_id, billing_info['reason'])
 
         return ExtractionResponse(
             task_id=task_id,
@@ -109,8 +196,11 @@ async def extract_from_document(request: ExtractionRequest, api_key: Optional[st
             result=agent_result
         )
 
+    except CheckpointConflictError:
+        # --- Not a failed run: the endpoint answers 409 (sync) or records the conflict (async) ---
+        raise
     except Exception as e:
-        logging.error(f"Agent task {task_id} failed for user {request.user_id}. Error: {e}")
+        logger.error("Agent task %s failed for user %s. Error: %s", task_id, request.user_id, e)
         return ExtractionResponse(
             task_id=task_id,
             user_id=request.user_id,
@@ -120,6 +210,202 @@ async def extract_from_document(request: ExtractionRequest, api_key: Optional[st
             error_message=str(e)
         )
 
+def _response_payload(response: ExtractionResponse) -> Dict[str, Any]:
+    """The response as plain data; the agent's `result` is passed through by reference, not copied."""
+    payload = response.model_dump(exclude={"result", "error_message"})
+    payload["result"] = response.result
+    payload["error_message"] = response.error_message
+    return payload
+
+def _wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+def _extraction_http_response(response: ExtractionResponse, ndjson: bool) -> Response:
+    """Encodes the response exactly once: one JSON document, or NDJSON with one constraint per line."""
+    payload = _response_payload(response)
+    if ndjson:
+        result = payload.pop("result") or {}
+        return StreamingResponse(serialization.iter_result_ndjson(payload, result), media_type=NDJSON_MEDIA_TYPE)
+    return Response(serialization.dumps_bytes(payload), media_type="application/json")
+
+def _run_stored_task(task_id: str, request: ExtractionRequest):
+    task_store.update(task_id, status="running")
+    try:
+        response = _run_extraction_task(task_id, request)
+    except CheckpointConflictError as e:
+        logger.warning("Task %s rejected: %s", task_id, e)
+        response = ExtractionResponse(
+            task_id=task_id, user_id=request.user_id, document_path=request.document_path,
+            status="failed", billing=decide_billing({"status": "AGENT_EXECUTION_FAILURE"}), error_message=str(e)
+        )
+    task_store.update(task_id, status=response.status, response=response)
+
+def _task_in_progress(task_id: str) -> bool:
+    existing = task_store.get(task_id)
+    return task_id in sync_task_ids or (existing is not None and existing["status"] in ("queued", "running"))
+
+def _resolve_batch_documents(request: BatchExtractionRequest) -> List[str]:
+    paths = list(request.document_paths)
+    if request.document_glob:
+        pattern = request.document_glob
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths.extend(p for p in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(p))
+    return list(dict.fromkeys(paths))
+
+async def _stream_batch(batch_id: str, request: BatchExtractionRequest, paths: List[str], first: asyncio.Future):
+    """
+    Yields one NDJSON line per document as it finishes, then a summary line.
+
+    At most `batch_runner.max_workers` documents of this batch are submitted at a time; the
+    rest are submitted as earlier ones finish, and none are once the client disconnects.
+    """
+    started = time.monotonic()
+    summary = {"batch_id": batch_id, "documents": len(paths), "completed": 0, "failed": 0,
+               "billable_documents": 0, "validated_items": 0, "billing_reasons": Counter()}
+    pending = {first}
+    next_index = 1
+    try:
+        while pending or next_index < len(paths):
+            while next_index < len(paths) and len(pending) < batch_runner.max_workers:
+                try:
+                    pending.add(asyncio.wrap_future(batch_runner.submit(_run_extraction_task, f"task_{uuid.uuid4()}", _batch_document_request(request, paths[next_index]))))
+                except QueueFullError:
+                    # --- Other batches hold the pool; this one continues as its own documents finish ---
+                    break
+                next_index += 1
+            if not pending:
+                # --- Other batches hold the whole pool; retry shortly ---
+                await asyncio.sleep(0.05)
+                continue
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                response: ExtractionResponse = future.result()
+                summary["completed" if response.status == "completed" else "failed"] += 1
+                summary["billable_documents"] += response.billing.billable
+                summary["validated_items"] += len((response.result or {}).get("validated_items", []))
+                summary["billing_reasons"][response.billing.reason] += 1
+                yield serialization.ndjson_line("document", _response_payload(response))
+    finally:
+        for future in pending:
+            future.cancel()
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["documents_per_second"] = round(len(paths) / elapsed, 3) if elapsed > 0 else None
+    logger.info("Batch %s finished: %d completed, %d failed in %.1fs", batch_id, summary["completed"], summary["failed"], elapsed)
+    yield serialization.ndjson_line("summary", summary)
+
+def _batch_document_request(request: BatchExtractionRequest, path: str) -> ExtractionRequest:
+    return ExtractionRequest(document_path=path, user_id=request.user_id, llm_base_url=request.llm_base_url,
+                             llm_model_name=request.llm_model_name, llm_api_key=request.llm_api_key)
+
+def _queue_full(e: QueueFullError) -> HTTPException:
+    logger.warning("Rejecting extraction request: %s", e)
+    return HTTPException(status_code=429, detail="Server is at capacity. Please retry later.", headers={"Retry-After": RETRY_AFTER_SECONDS})
+
+# --- API Endpoints ---
+@app.post("/v1/extract", 
+            response_model=ExtractionResponse, 
+            summary="Run a Billable Extraction Task",
+            tags=["Agent API"],
+            responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def extract_from_document(request: ExtractionRequest, api_key: Optional[str] = Depends(get_api_key),
+                                accept: Optional[str] = Header(None)):
+    task_id = request.task_id or f"task_{uuid.uuid4()}"
+    if _task_in_progress(task_id):
+        raise HTTPException(status_code=409, detail="A task with this id is already in progress.")
+    sync_task_ids.add(task_id)
+    try:
+        future = task_runner.submit(_run_extraction_task, task_id, request)
+        response = await asyncio.wrap_future(future)
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except CheckpointConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        sync_task_ids.discard(task_id)
+    return _extraction_http_response(response, _wants_ndjson(accept))
+
+@app.post("/v1/extract/async",
+            response_model=TaskSubmission,
+            status_code=202,
+            summary="Submit a Billable Extraction Task and Return Immediately",
+            tags=["Agent API"])
+async def submit_extraction(request: ExtractionRequest, api_key: Optional[str] = Depends(get_api_key)):
+    task_id = request.task_id or f"task_{uuid.uuid4()}"
+    if _task_in_progress(task_id):
+        raise HTTPException(status_code=409, detail="A task with this id is already in progress.")
+    task_store.create(task_id, user_id=request.user_id)
+    try:
+        task_runner.submit(_run_stored_task, task_id, request)
+    except QueueFullError as e:
+        task_store.update(task_id, status="rejected")
+        raise _queue_full(e)
+    return TaskSubmission(task_id=task_id, status="queued")
+
+@app.post("/v1/extract/batch",
+            summary="Run Billable Extraction Tasks for Many Documents",
+            tags=["Agent API"],
+            response_class=StreamingResponse,
+            responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def extract_batch(request: BatchExtractionRequest, api_key: Optional[str] = Depends(get_api_key)):
+    paths = _resolve_batch_documents(request)
+    if not paths:
+        raise HTTPException(status_code=400, detail="No documents matched the request.")
+    if len(paths) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"Batch has {len(paths)} documents; the limit is {MAX_BATCH_DOCUMENTS}.")
+    batch_id = f"batch_{uuid.uuid4()}"
+    try:
+        # --- The first document is admitted before streaming starts, so a saturated server can still answer 429 ---
+        first = asyncio.wrap_future(batch_runner.submit(_run_extraction_task, f"task_{uuid.uuid4()}", _batch_document_request(request, paths[0])))
+    except QueueFullError as e:
+        raise _queue_full(e)
+    logger.info("Starting batch %s with %d documents for user %s", batch_id, len(paths), request.user_id)
+    return StreamingResponse(_stream_batch(batch_id, request, paths, first), media_type=NDJSON_MEDIA_TYPE)
+
+@app.get("/v1/tasks/{task_id}",
+            response_model=TaskStatus,
+            summary="Poll an Extraction Task",
+            tags=["Agent API"])
+async def get_task(task_id: str, api_key: Optional[str] = Depends(get_api_key), accept: Optional[str] = Header(None)):
+    task = task_store.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found or expired.")
+    response = task["response"]
+    if response is not None and _wants_ndjson(accept):
+        return _extraction_http_response(response, ndjson=True)
+    payload = {"task_id": task_id, "status": task["status"], "response": _response_payload(response) if response is not None else None}
+    return Response(serialization.dumps_bytes(payload), media_type="application/json")
+
+@app.get("/v1/constraints",
+            response_model=ConstraintPage,
+            summary="Query Stored Constraints",
+            tags=["Agent API"])
+async def query_constraints(
+    applicable_object: Optional[str] = None,
+    source_document: Optional[str] = None,
+    source_ref: Optional[str] = None,
+    unit: Optional[str] = None,
+    operator: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    api_key: Optional[str] = Depends(get_api_key)
+):
+    constraint_store = get_task_constraint_store()
+    if constraint_store is None:
+        raise HTTPException(status_code=503, detail="Constraint store is disabled.")
+    filters = {
+        "applicable_object": applicable_object, "source_document": source_document,
+        "source_ref": source_ref, "unit": unit, "operator": operator,
+    }
+    items, next_cursor = await asyncio.to_thread(constraint_store.query, filters, limit, cursor)
+    return ConstraintPage(items=items, next_cursor=next_cursor)
+
+@app.get("/metrics", summary="Prometheus Metrics", tags=["Management"], response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health", summary="Health Check", tags=["Management"])
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "workers": task_runner.stats()}
@@ -0,0 +1,134 @@
+"""
+Durable checkpoints of agent runs, so a crashed or restarted task resumes
+without paying for its completed LLM calls again.
+
+For each task id the store keeps the last state the FSM entered. It also keeps
+a journal of every LLM completion the run received, keyed by the same content
+hash as the response cache. A resumed run replays its deterministic local
+states (ingest, structure analysis, planning, validation). Calls found in the
+journal are answered from it instead of the endpoint. A task that had already
+reached DONE returns its stored output unchanged, which makes resubmitting a
+task idempotent.
+
+Each checkpoint also stores a fingerprint of the run that wrote it (document
+path and content, user, LLM endpoint and model). A task id reused for a
+different run raises `CheckpointConflictError` instead of resuming, so one
+caller can never receive or overwrite another's checkpointed result.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from .sqlite_store import SQLiteStore, data_path, shared_store
+
+
+class CheckpointConflictError(Exception):
+    """The task id is checkpointed for a different document, user or LLM configuration."""
+
+
+def run_fingerprint(document_path: str, user_id: Optional[str], base_url: str, model_name: str) -> str:
+    """Identifies what a checkpointed run extracts, and for whom: document path and content hash, user and LLM config."""
+    content = hashlib.sha256()
+    try:
+        with open(document_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                content.update(block)
+    except OSError:
+        content = None
+    return hashlib.sha256(json.dumps(
+        [document_path, content.hexdigest() if content else None, user_id, base_url, model_name], ensure_ascii=False
+    ).encode("utf-8")).hexdigest()
+
+
+class CheckpointStore(SQLiteStore):
+    """
+    SQLite store of per-task FSM states and LLM call journals.
+
+    Args:
+        path: SQLite database file.
+        ttl_seconds: Checkpoints not updated for this long are dropped when the store is opened.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        # --- A journal entry lost to power failure only costs one repeated call, so synchronous=NORMAL is enough ---
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "task_id TEXT PRIMARY KEY, state TEXT NOT NULL, final_output TEXT, updated_at REAL NOT NULL, fingerprint TEXT)"
+        )
+        # --- Stores created before fingerprints existed; their rows never match and are not resumed ---
+        if "fingerprint" not in {row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")}:
+            self._conn.execute("ALTER TABLE checkpoints ADD COLUMN fingerprint TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_journal ("
+            "task_id TEXT NOT NULL, call_key TEXT NOT NULL, output TEXT NOT NULL, PRIMARY KEY (task_id, call_key))"
+        )
+        self._conn.commit()
+        self.prune(ttl_seconds)
+
+    def load(self, task_id: str, fingerprint: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Returns (last state name, final output or None) for a checkpointed task.
+
+        Raises:
+            CheckpointConflictError: The checkpoint was written by a run with another fingerprint.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT state, final_output, fingerprint FROM checkpoints WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        if row[2] != fingerprint:
+            raise CheckpointConflictError(f"Task id '{task_id}' is already used for a different document, user or LLM configuration.")
+        return row[0], row[1]
+
+    def save_state(self, task_id: str, state: str, fingerprint: str, final_output: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (task_id, state, final_output, updated_at, fingerprint) VALUES (?, ?, ?, ?, ?)",
+                (task_id, state, final_output, time.time(), fingerprint)
+            )
+            if final_output is not None:
+                # --- The output is final; the journal is no longer needed to reproduce it ---
+                self._conn.execute("DELETE FROM llm_journal WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def load_journal(self, task_id: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT call_key, output FROM llm_journal WHERE task_id = ?", (task_id,)).fetchall()
+        return dict(rows)
+
+    def record_call(self, task_id: str, call_key: str, output: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_journal (task_id, call_key, output) VALUES (?, ?, ?)",
+                               (task_id, call_key, output))
+            self._conn.commit()
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_journal WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def prune(self, ttl_seconds: float):
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM llm_journal WHERE task_id IN (SELECT task_id FROM checkpoints WHERE updated_at < ?)", (cutoff,)
+            )
+            self._conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+
+
+def get_checkpoint_store(path: Optional[str] = None) -> CheckpointStore:
+    """
+    Returns the process-wide store for `path`.
+
+    Environment:
+        AGENT_CHECKPOINT_PATH: SQLite file (default AGENT_DATA_DIR/checkpoints.sqlite).
+        AGENT_CHECKPOINT_TTL: seconds a checkpoint is kept after its last update (default 7 days).
+    """
+    path = path or os.getenv("AGENT_CHECKPOINT_PATH", data_path("checkpoints.sqlite"))
+    return shared_store(CheckpointStore, path, ttl_seconds=float(os.getenv("AGENT_CHECKPOINT_TTL", str(7 * 24 * 3600))))
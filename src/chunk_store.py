@@ -0,0 +1,92 @@
+"""
+Persistent per-chunk result store for incremental re-extraction.
+
+Validated items are stored under a content hash of the chunk they came from
+(salted with the extraction configuration), and each document key remembers
+the chunk hashes of its latest revision. When a revised document is
+submitted, unchanged chunks reuse their stored items and only new or edited
+chunks go through EXTRACTION/VALIDATION/REPAIR.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .sqlite_store import SQLiteStore, data_path, shared_store
+
+# --- Fields that identify a constraint for revision diffs; ids and run metadata are excluded ---
+FINGERPRINT_EXCLUDED_FIELDS = ("id", "source_document", "extraction_metadata")
+
+
+def chunk_hash(salt: str, text: str) -> str:
+    """Content hash of a chunk under one extraction configuration (`salt`)."""
+    return hashlib.sha256(f"{salt}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def constraint_fingerprint(item: Dict[str, Any]) -> str:
+    """Stable identity of a constraint, used to diff revisions."""
+    content = {k: v for k, v in item.items() if k not in FINGERPRINT_EXCLUDED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ChunkResultStore(SQLiteStore):
+    """
+    SQLite store of validated items keyed by chunk hash.
+
+    Args:
+        path: SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_results ("
+            "chunk_hash TEXT PRIMARY KEY, items TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_revisions ("
+            "document_key TEXT PRIMARY KEY, chunk_hashes TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_items(self, hashes: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns stored items for every hash that has an entry; missing hashes are omitted."""
+        hashes = list(hashes)
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, items FROM chunk_results WHERE chunk_hash IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((h, json.loads(items)) for h, items in rows)
+        return found
+
+    def put_items(self, items_by_hash: Dict[str, List[Dict[str, Any]]]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_results (chunk_hash, items, created_at) VALUES (?, ?, ?)",
+                [(h, json.dumps(items, ensure_ascii=False), now) for h, items in items_by_hash.items()]
+            )
+            self._conn.commit()
+
+    def get_revision(self, document_key: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT chunk_hashes FROM document_revisions WHERE document_key = ?", (document_key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_revision(self, document_key: str, hashes: List[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_revisions (document_key, chunk_hashes, updated_at) VALUES (?, ?, ?)",
+                (document_key, json.dumps(hashes), time.time())
+            )
+            self._conn.commit()
+
+
+def get_chunk_store(path: Optional[str] = None) -> ChunkResultStore:
+    """Returns the process-wide store for `path` (default: AGENT_CHUNK_STORE_PATH or AGENT_DATA_DIR/chunk_store.sqlite)."""
+    return shared_store(ChunkResultStore, path or os.getenv("AGENT_CHUNK_STORE_PATH", data_path("chunk_store.sqlite")))
@@ -0,0 +1,197 @@
+"""
+Document chunkers for the Spec Extraction Agent.
+
+`iter_blank_line_chunks` is the streaming counterpart of
+`ExtractionAgentFinal._analyze_structure`: it memory-maps the document and
+yields blank-line-separated sections one at a time, so peak memory does not
+grow with document size and extraction can start before chunking finishes.
+
+`iter_clause_chunks` is a structure-aware alternative for GB-style specs: it
+splits on clause numbers (3.2.1) and box-drawing tables (表3.2.3), caps each
+chunk at a token budget and uses the clause or table number as `source_ref`.
+
+Chunks are `Chunk` records. A record holds (start, end) offsets into a shared
+buffer, usually the whole document, instead of a copy of its text.
+"""
+
+import mmap
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+SECTION_SEPARATOR = b"\n\n"
+MIN_CHUNK_CHARS = 50
+
+CLAUSE_RE = re.compile(r"^\s*(\d+(?:\.\d+){2,})\s+\S")
+SECTION_HEADING_RE = re.compile(r"^\s*(?:第\s*[\d一二三四五六七八九十百]+\s*章|附录\s*[A-Z]|\d+\.\d+)\s+\S")
+TABLE_CAPTION_RE = re.compile(r"^\s*(表\s*[A-Z]?\d+(?:\.\d+)*)")
+TABLE_BORDER_CHARS = "┌┐└┘├┤┬┴┼─│┃━"
+MAX_HEADING_CHARS = 40
+
+
+class Chunk:
+    """
+    One document chunk: `buffer[start:end]` plus its `source_ref`.
+
+    Chunks cut straight from the document share the document string as their
+    buffer, so a chunk costs a few machine words instead of a copy of its text.
+    Chunks whose text had to be assembled (a clause with its section heading,
+    a split table with repeated header rows) own a buffer holding just that text.
+    """
+
+    __slots__ = ("index", "source_ref", "buffer", "start", "end")
+
+    def __init__(self, index: int, source_ref: str, buffer: str, start: int = 0, end: Optional[int] = None):
+        self.index = index
+        self.source_ref = source_ref
+        self.buffer = buffer
+        self.start = start
+        self.end = len(buffer) if end is None else end
+
+    @property
+    def id(self) -> str:
+        return f"chunk_{self.index}"
+
+    @property
+    def text(self) -> str:
+        """The chunk text; sliced on access, so callers should not hold on to it longer than needed."""
+        if self.start == 0 and self.end == len(self.buffer):
+            return self.buffer
+        return self.buffer[self.start:self.end]
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.id}, {self.source_ref!r}, {self.end - self.start} chars)"
+
+
+def split_blank_line_chunks(content: str, min_chars: int = MIN_CHUNK_CHARS) -> List[Chunk]:
+    """In-memory blank-line chunker: same chunks as `str.split('\\n\\n')`, as offsets into `content`."""
+    chunks: List[Chunk] = []
+    start, index, size = 0, 0, len(content)
+    while start <= size:
+        end = content.find("\n\n", start)
+        if end == -1:
+            end = size
+        # --- Raw length first; the stripped copy is only made for sections that could pass ---
+        if end - start > min_chars and len(content[start:end].strip()) > min_chars:
+            line_end = content.find("\n", start, end)
+            heading_end = min(line_end if line_end != -1 else end, start + 70)
+            chunks.append(Chunk(index, content[start:heading_end], content, start, end))
+        index += 1
+        start = end + 2
+    return chunks
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: roughly one token per CJK character and per four other characters."""
+    cjk = sum(1 for ch in text if '\u4e00' <= ch <= '\u9fff')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def iter_blank_line_chunks(path: str, min_chars: int = MIN_CHUNK_CHARS) -> Iterator[Chunk]:
+    """
+    Yields chunks of `path` split on blank lines, without loading the file into memory.
+
+    Chunk ids and the short-section filter match the in-memory analyzer. Each
+    chunk's `source_ref` is anchored with its byte range in the file.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start, index, size = 0, 0, len(mm)
+        while start <= size:
+            end = mm.find(SECTION_SEPARATOR, start)
+            if end == -1:
+                end = size
+            # --- "\n" is a single byte in UTF-8, so slicing on it never splits a character ---
+            section = mm[start:end].decode("utf-8", errors="replace")
+            if len(section.strip()) > min_chars:
+                heading = section.split("\n")[0][:70]
+                yield Chunk(index, f"{heading} [bytes {start}-{end}]", section)
+            index += 1
+            start = end + len(SECTION_SEPARATOR)
+
+
+def _is_table_line(line: str) -> bool:
+    stripped = line.lstrip()
+    return bool(stripped) and stripped[0] in TABLE_BORDER_CHARS
+
+
+def _split_to_budget(ref: str, prefix: List[str], lines: List[str], max_tokens: int) -> List[Tuple[str, str]]:
+    """Splits `lines` on line boundaries so each part, with `prefix` repeated, fits `max_tokens`."""
+    text = "\n".join(prefix + lines)
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return [(ref, text)]
+    base_tokens = estimate_tokens("\n".join(prefix))
+    parts, current, tokens = [], [], base_tokens
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1
+        if current and tokens + line_tokens > max_tokens:
+            parts.append(current)
+            current, tokens = [], base_tokens
+        current.append(line)
+        tokens += line_tokens
+    parts.append(current)
+    # --- Don't emit a part that is only a table's closing border ---
+    if len(parts) > 1 and all(not line.strip(TABLE_BORDER_CHARS + " ") for line in parts[-1]):
+        parts[-2].extend(parts.pop())
+    return [(f"{ref} ({i}/{len(parts)})", "\n".join(prefix + part)) for i, part in enumerate(parts, 1)]
+
+
+def iter_clause_chunks(lines: Iterable[str], max_tokens: int = 800) -> Iterator[Chunk]:
+    """
+    Yields one chunk per numbered clause, table or free-text paragraph.
+
+    Each chunk's text is prefixed with the enclosing section heading (e.g.
+    "3.2 建筑耐火等级") so short clauses keep their context. Chunks over
+    `max_tokens` are split on line boundaries; split tables repeat their caption
+    and header rows. `lines` may be any iterable of lines, including an open file.
+    """
+    heading: Optional[str] = None
+    kind: Optional[str] = None
+    ref: Optional[str] = None
+    body: List[str] = []
+    index = 0
+
+    def close() -> List[Tuple[str, str]]:
+        if not body:
+            return []
+        prefix = [heading] if heading else []
+        if kind == "table":
+            header_end = next((i + 1 for i, line in enumerate(body) if line.lstrip().startswith("├")), 1)
+            return _split_to_budget(ref, prefix + body[:header_end], body[header_end:], max_tokens)
+        if kind == "paragraph":
+            return _split_to_budget(body[0].strip()[:70], [], body, max_tokens)
+        return _split_to_budget(ref, prefix, body, max_tokens)
+
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        pending: List[Tuple[str, str]] = []
+
+        if not line.strip():
+            pending, kind, ref, body = close(), None, None, []
+        elif kind == "table" and _is_table_line(line):
+            body.append(line)
+        elif TABLE_CAPTION_RE.match(line) or _is_table_line(line):
+            pending = close()
+            caption = TABLE_CAPTION_RE.match(line)
+            kind, body = "table", [line]
+            ref = re.sub(r"\s+", "", caption.group(1)) if caption else f"{heading or 'table'} [table]"
+        elif CLAUSE_RE.match(line):
+            pending = close()
+            kind, ref, body = "clause", CLAUSE_RE.match(line).group(1), [line]
+        elif SECTION_HEADING_RE.match(line) and len(line.strip()) <= MAX_HEADING_CHARS:
+            pending, kind, ref, body = close(), None, None, []
+            heading = line.strip()
+        elif kind in ("clause", "paragraph"):
+            body.append(line)
+        else:
+            pending = close()
+            kind, ref, body = "paragraph", None, [line]
+
+        for chunk_ref, text in pending:
+            yield Chunk(index, chunk_ref, text)
+            index += 1
+
+    for chunk_ref, text in close():
+        yield Chunk(index, chunk_ref, text)
+        index += 1
@@ -0,0 +1,118 @@
+"""
+Embedded, indexed store of validated constraints.
+
+The API server writes each completed extraction's `validated_items` here so
+downstream compliance checks can query constraints (e.g. everything on
+"防火墙") without re-running extraction or re-scanning result JSON. Every
+filterable field has its own SQLite index, and pagination is keyset-based on
+the row id, so a page costs an index range scan regardless of table size.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .chunk_store import constraint_fingerprint
+from .sqlite_store import SQLiteStore, data_path, shared_store
+
+# --- Item fields exposed as indexed, equality-filterable columns ---
+INDEXED_FIELDS = ("applicable_object", "source_document", "source_ref", "unit", "operator")
+MAX_PAGE_SIZE = 1000
+
+
+class ConstraintStore(SQLiteStore):
+    """
+    SQLite store of validated constraint items.
+
+    A complete re-extraction of a document replaces its previously stored
+    constraints, so the store holds the latest result per `source_document`.
+    A partial one (some calls or items failed) only adds constraints that are
+    not stored yet, so an outage never deletes good data.
+
+    Args:
+        path: SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS constraints ("
+            "seq INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, task_id TEXT, user_id TEXT, "
+            + ", ".join(f"{field} TEXT" for field in INDEXED_FIELDS)
+            + ", item TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        for field in INDEXED_FIELDS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_constraints_{field} ON constraints ({field})")
+        self._conn.commit()
+
+    def replace_document(self, source_document: str, items: List[Dict[str, Any]], task_id: Optional[str] = None, user_id: Optional[str] = None):
+        """Atomically replaces all stored constraints of `source_document` with `items`."""
+        now = time.time()
+        rows = [self._row(item, task_id, user_id, now) for item in items]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM constraints WHERE source_document = ?", (source_document,))
+            self._insert(rows)
+
+    def merge_document(self, source_document: str, items: List[Dict[str, Any]], task_id: Optional[str] = None,
+                       user_id: Optional[str] = None) -> int:
+        """Adds the `items` whose content is not stored for `source_document` yet; returns how many were added."""
+        now = time.time()
+        with self._lock, self._conn:
+            stored = {constraint_fingerprint(json.loads(item)) for (item,) in self._conn.execute(
+                "SELECT item FROM constraints WHERE source_document = ?", (source_document,))}
+            rows = []
+            for item in items:
+                fingerprint = constraint_fingerprint(item)
+                if fingerprint not in stored:
+                    stored.add(fingerprint)
+                    rows.append(self._row(item, task_id, user_id, now))
+            self._insert(rows)
+        return len(rows)
+
+    def _row(self, item: Dict[str, Any], task_id: Optional[str], user_id: Optional[str], now: float) -> tuple:
+        return (item["id"], task_id, user_id, *(item.get(field) for field in INDEXED_FIELDS), json.dumps(item, ensure_ascii=False), now)
+
+    def _insert(self, rows: List[tuple]):
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO constraints (id, task_id, user_id, {', '.join(INDEXED_FIELDS)}, item, created_at) "
+            f"VALUES ({', '.join('?' * (len(INDEXED_FIELDS) + 5))})",
+            rows
+        )
+
+    def query(self, filters: Dict[str, Optional[str]], limit: int = 100, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Returns constraints matching every non-None filter in `filters` (exact match).
+
+        Args:
+            filters: Mapping of an `INDEXED_FIELDS` name to the required value.
+            limit: Page size, capped at `MAX_PAGE_SIZE`.
+            cursor: `next_cursor` from the previous page; None for the first page.
+
+        Returns:
+            A tuple `(items, next_cursor)`; `next_cursor` is None on the last page.
+        """
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"Unknown filter field: {field}")
+            if value is not None:
+                clauses.append(f"{field} = ?")
+                params.append(value)
+        if cursor is not None:
+            clauses.append("seq > ?")
+            params.append(cursor)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, item FROM constraints {where} ORDER BY seq LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(item) for _, item in rows[:limit]], next_cursor
+
+
+def get_constraint_store() -> Optional[ConstraintStore]:
+    """Returns the process-wide store for AGENT_CONSTRAINT_STORE_PATH (default AGENT_DATA_DIR/constraints.sqlite); an empty path disables it."""
+    path = os.getenv("AGENT_CONSTRAINT_STORE_PATH", data_path("constraints.sqlite"))
+    return shared_store(ConstraintStore, path) if path else None
@@ -0,0 +1,101 @@
+"""
+Multi-keyword goal router for the Spec Extraction Agent.
+
+Builds an Aho–Corasick automaton once from the keywords of every extraction
+goal, so routing all goals over a document costs a single pass over its text
+instead of one substring search per (goal, chunk, keyword).
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from .chunking import Chunk
+
+
+class KeywordIndex:
+    """
+    Aho–Corasick automaton mapping keywords back to the goals that declared them.
+
+    Args:
+        goals: Extraction goals as produced by `_plan_extraction`, each with `id` and `keywords`.
+    """
+
+    def __init__(self, goals: Iterable[Dict]):
+        self.goal_order: List[str] = []
+        self.keyword_goals: Dict[str, List[str]] = {}
+        for goal in goals:
+            self.goal_order.append(goal['id'])
+            for kw in goal.get('keywords', []):
+                if kw:
+                    self.keyword_goals.setdefault(kw, []).append(goal['id'])
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for kw in self.keyword_goals:
+            self._insert(kw)
+        self._build_failure_links()
+
+    def _insert(self, keyword: str):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(keyword)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yields (start_offset, keyword) for every keyword occurrence in `text`, in one pass."""
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kw in out[node]:
+                yield pos - len(kw) + 1, kw
+
+    def match(self, text: str) -> Set[str]:
+        """Returns the set of distinct keywords occurring in `text`."""
+        return {kw for _, kw in self.iter_matches(text)}
+
+    def goals_for(self, keywords: Iterable[str]) -> List[str]:
+        """Returns the ids of goals hit by `keywords`, in plan order."""
+        hit = {gid for kw in keywords for gid in self.keyword_goals.get(kw, ())}
+        return [gid for gid in self.goal_order if gid in hit]
+
+    def route(self, chunks: Iterable[Chunk]) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """
+        Routes every chunk to the goals whose keywords it contains.
+
+        Returns:
+            A tuple `(chunk_goals, keyword_hits)`: chunk id -> matched goal ids, and
+            chunk id -> sorted matched keywords (kept for auditing). Chunks without
+            any hit are omitted from both.
+        """
+        chunk_goals: Dict[str, List[str]] = {}
+        keyword_hits: Dict[str, List[str]] = {}
+        for chunk in chunks:
+            keywords = self.match(chunk.text)
+            if keywords:
+                chunk_id = chunk.id
+                keyword_hits[chunk_id] = sorted(keywords)
+                chunk_goals[chunk_id] = self.goals_for(keywords)
+        return chunk_goals, keyword_hits
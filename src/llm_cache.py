@@ -0,0 +1,177 @@
+"""
+Content-addressed LLM response cache for the Spec Extraction Agent.
+
+Completions are keyed on a SHA-256 of (model, base_url, prompts, generation
+parameters). Lookups go through an in-memory LRU tier first and fall back to
+a persistent SQLite tier, so repeated extractions of the same document cost
+no tokens, even across process restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .sqlite_store import connect, data_path
+
+
+def make_cache_key(model_name: str, base_url: str, system_prompt: str, user_prompt: str, **params: Any) -> str:
+    """Returns a stable hex digest identifying one completion request."""
+    payload = json.dumps({
+        "model": model_name,
+        "base_url": base_url,
+        "system": system_prompt,
+        "user": user_prompt,
+        "params": params,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache for LLM completions.
+
+    Args:
+        path: SQLite file for the persistent tier. `None` keeps the cache in memory only.
+        max_memory_entries: Capacity of the in-memory LRU tier.
+        max_disk_entries: Capacity of the SQLite tier; oldest entries are evicted first.
+        ttl_seconds: Entries older than this are treated as misses and purged. `None` disables expiry.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 100_000, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+        if path:
+            self._conn = connect(path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+            self._conn.commit()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1]):
+                        self._remember(key, row[0], row[1])
+                        self.stats["disk_hits"] += 1
+                        return row[0]
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, response: str):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, response, created_at)
+            self.stats["writes"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, created_at)
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY created_at LIMIT ?)",
+                (overflow,)
+            )
+            self.stats["disk_evictions"] += overflow
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "memory_entries": len(self._memory), "hit_rate": self.hit_rate()}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# --- Process-wide default cache, configured from the environment ---
+_default_cache: Optional[LLMResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the shared cache used by `LLMClient` unless one is passed explicitly.
+
+    Environment:
+        AGENT_LLM_CACHE: set to "0" to disable caching entirely.
+        AGENT_LLM_CACHE_PATH: SQLite file for the persistent tier (default AGENT_DATA_DIR/llm_cache.sqlite, empty = memory only).
+        AGENT_LLM_CACHE_TTL: entry lifetime in seconds (unset = no expiry).
+        AGENT_LLM_CACHE_MAX_ENTRIES: capacity of the persistent tier.
+    """
+    global _default_cache
+    if os.getenv("AGENT_LLM_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = os.getenv("AGENT_LLM_CACHE_TTL")
+            _default_cache = LLMResponseCache(
+                path=os.getenv("AGENT_LLM_CACHE_PATH", data_path("llm_cache.sqlite")) or None,
+                max_disk_entries=int(os.getenv("AGENT_LLM_CACHE_MAX_ENTRIES", "100000")),
+                ttl_seconds=float(ttl) if ttl else None,
+            )
+        return _default_cache
+
+
+def peek_default_cache() -> Optional[LLMResponseCache]:
+    """Returns the shared cache if something has already created it, without opening it."""
+    return _default_cache
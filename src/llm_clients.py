@@ -0,0 +1,130 @@
+"""
+Process-wide registry of pooled LLM HTTP clients.
+
+Building an `OpenAI` client per agent run throws away its connection pool, so
+every task paid fresh TCP/TLS handshakes. `LLMClientRegistry` keeps one client
+per `(base_url, api_key)` on a shared keep-alive pool, hands it out through
+short leases, and closes clients that have not been leased for a while. The
+per-request `llm_base_url`/`llm_api_key` overrides simply select (or create)
+another registry entry.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = ("client", "leases", "last_used")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+def _close(client: Any):
+    close = getattr(client, "close", None)
+    if close is not None:
+        close()
+
+
+class LLMClientRegistry:
+    """
+    Shared OpenAI-compatible clients keyed by `(base_url, api_key)`.
+
+    Args:
+        max_connections: Connection cap per client (per endpoint and key).
+        max_keepalive_connections: Idle keep-alive connections kept per client.
+        keepalive_expiry: Seconds an idle keep-alive connection is kept open.
+        idle_ttl: Seconds after its last lease before an unused client is closed.
+        factory: Optional `factory(base_url, api_key)` building a client; by default
+            an `OpenAI` client on a pooled `httpx.Client`.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10, keepalive_expiry: float = 30.0,
+                 idle_ttl: float = 300.0, factory: Optional[Callable[[str, str], Any]] = None):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.idle_ttl = idle_ttl
+        self._factory = factory or self._create_openai_client
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "evicted": 0}
+
+    def _create_openai_client(self, base_url: str, api_key: str) -> Any:
+        import httpx
+        from openai import OpenAI
+
+        http_client = httpx.Client(limits=httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        ))
+        # --- Retries are handled by LLMClient (see llm_resilience), so the SDK's own are disabled ---
+        return OpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=0)
+
+    @contextmanager
+    def lease(self, base_url: str, api_key: str) -> Iterator[Any]:
+        """Yields the shared client for `(base_url, api_key)`; it is never evicted while leased."""
+        key = (base_url, api_key)
+        with self._lock:
+            self._evict_idle_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(self._factory(base_url, api_key))
+                self._entries[key] = entry
+                self.stats["created"] += 1
+            else:
+                self.stats["reused"] += 1
+            entry.leases += 1
+        try:
+            yield entry.client
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Closes clients that are not leased and have been idle longer than `idle_ttl`; returns how many."""
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def _evict_idle_locked(self) -> int:
+        now = time.monotonic()
+        idle = [k for k, e in self._entries.items() if e.leases == 0 and now - e.last_used > self.idle_ttl]
+        for key in idle:
+            _close(self._entries.pop(key).client)
+        self.stats["evicted"] += len(idle)
+        return len(idle)
+
+    def close(self):
+        with self._lock:
+            for entry in self._entries.values():
+                _close(entry.client)
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_default_registry: Optional[LLMClientRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> LLMClientRegistry:
+    """Returns the process-wide registry, configured from the AGENT_LLM_POOL_* environment variables."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = LLMClientRegistry(
+                max_connections=int(os.getenv("AGENT_LLM_POOL_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("AGENT_LLM_POOL_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("AGENT_LLM_POOL_KEEPALIVE_EXPIRY", "30")),
+                idle_ttl=float(os.getenv("AGENT_LLM_CLIENT_IDLE_TTL", "300")),
+            )
+        return _default_registry
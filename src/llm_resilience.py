@@ -0,0 +1,248 @@
+"""
+Rate limiting, retry and failure isolation for LLM endpoints.
+
+One `EndpointGuard` exists per `(base_url, api_key)` and is shared by every
+`LLMClient` talking to it:
+
+- `AdaptiveTokenBucket` paces requests; a 429 halves the rate and pauses the
+  bucket for the server's Retry-After, successes raise it back additively.
+  No client-side cap applies until the first 429 unless one is configured.
+- `CircuitBreaker` fails fast after consecutive transport/5xx failures and
+  lets a single probe through once the reset timeout has passed.
+- `LatencyTracker` keeps recent call latencies so `LLMClient` can send a
+  hedged duplicate request once a call runs past a latency percentile.
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint's circuit breaker is open."""
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error, or None for transport errors and timeouts."""
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Parses the Retry-After header (seconds or HTTP date) of an SDK error, if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def is_retryable(status: Optional[int]) -> bool:
+    return status is None or status in (408, 409, 429) or status >= 500
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate follows the provider's limits (AIMD).
+
+    Without a configured `rate` the bucket is inactive and requests pass
+    unpaced until the first 429. The rate is then set to half of the request
+    rate observed over the last second, and successes raise it additively
+    with no ceiling, so only the provider's own limits slow calls down.
+
+    Args:
+        rate: Initial and maximum requests per second; None for no client-side cap.
+        burst: Bucket capacity (default: the current rate).
+        min_rate: Floor the rate never drops below after 429s.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None, min_rate: float = 0.2):
+        self.max_rate = rate
+        self.rate = rate
+        self.fixed_burst = burst
+        self.burst = max(1.0, burst if burst is not None else (rate or 1.0))
+        self.min_rate = min(min_rate, rate) if rate else min_rate
+        self.tokens = self.burst
+        self.paused_until = 0.0
+        # --- Additive increase per success: 5% of the cap, or of the rate adopted at the first 429 ---
+        self._step = rate * 0.05 if rate else 0.0
+        self._recent: deque = deque(maxlen=10000)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, now: float) -> bool:
+        if self.rate is None:
+            if now < self.paused_until:
+                return False
+            self._recent.append(now)
+            return True
+        self._refill(now)
+        if now >= self.paused_until and self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._take(now):
+                    return
+                wait = self.paused_until - now
+                if self.rate is not None:
+                    wait = max(wait, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Takes a token only if one is available right now."""
+        with self._lock:
+            return self._take(time.monotonic())
+
+    def on_throttled(self, retry_after: Optional[float]):
+        """Halves the rate and pauses for `retry_after` seconds (or one refill interval)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate is None:
+                # --- First 429 on an unpaced endpoint: start from the rate that was actually being sent ---
+                observed = float(sum(1 for t in self._recent if now - t <= 1.0))
+                self.rate = max(self.min_rate, observed)
+                self._step = self.rate * 0.05
+                self.burst = max(1.0, self.fixed_burst if self.fixed_burst is not None else self.rate)
+                self._recent.clear()
+                self._updated = now
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.paused_until = max(self.paused_until, now + (retry_after if retry_after is not None else 1 / self.rate))
+
+    def on_success(self):
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self._step
+                if self.max_rate is not None:
+                    self.rate = min(self.max_rate, self.rate)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds the circuit stays open before a probe is allowed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        """Raises CircuitOpenError unless the call may proceed."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._probing:
+                raise CircuitOpenError("Circuit breaker is open.")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The `p`-th percentile (0-100) of the window, or None until `min_samples` calls were seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class EndpointGuard:
+    """Rate limiter, circuit breaker and latency window shared by all calls to one endpoint."""
+
+    def __init__(self, rate: Optional[float], burst: Optional[float], failure_threshold: int, reset_timeout: float):
+        self.bucket = AdaptiveTokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "short_circuited": 0, "hedged": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+
+_guards: Dict[Tuple[str, str], EndpointGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_endpoint_guard(base_url: str, api_key: str) -> EndpointGuard:
+    """Returns the process-wide guard for an endpoint, configured from the AGENT_LLM_* environment variables."""
+    key = (base_url, api_key)
+    with _guards_lock:
+        if key not in _guards:
+            # --- Unset or 0: no cap; the endpoint is only paced after it answers 429 ---
+            rate = float(os.getenv("AGENT_LLM_RATE_LIMIT", "0")) or None
+            burst = os.getenv("AGENT_LLM_RATE_BURST")
+            _guards[key] = EndpointGuard(
+                rate=rate,
+                burst=float(burst) if burst else None,
+                failure_threshold=int(os.getenv("AGENT_LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("AGENT_LLM_BREAKER_RESET", "30")),
+            )
+        return _guards[key]
@@ -0,0 +1,86 @@
+"""
+Deterministic local repairs for LLM extraction output.
+
+Most REPAIR-state traffic is mechanical: Markdown code fences around the JSON,
+a bare object instead of an array, trailing commas, or a numeric `value` whose
+unit is plainly written in the source text. These helpers fix such cases
+without an LLM round trip; anything they cannot fix is left for `_repair`.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_NUMBER_WITH_UNIT_RE = re.compile(r"(?<![\d.])(\d+(?:\.\d+)?)\s*([A-Za-z°℃%‰][A-Za-z0-9°℃%‰²³/·]*)")
+
+OPERATOR_ALIASES = {
+    "≥": ">=", "=>": ">=", "≤": "<=", "=<": "<=",
+    "=": "==", "≠": "!=", "<>": "!=", "＞": ">", "＜": "<",
+}
+
+
+def parse_llm_json(raw_text: str) -> Tuple[Any, List[str]]:
+    """
+    Parses an LLM response into a JSON array, applying local text fixes when needed.
+
+    Returns:
+        A tuple `(parsed, fixes)` where `fixes` names every fix that was applied
+        (empty for a clean response).
+
+    Raises:
+        json.JSONDecodeError: if the text is still not valid JSON after the fixes.
+        TypeError: if the result is neither an array nor a single object.
+    """
+    fixes: List[str] = []
+    text = raw_text.strip()
+    fence = _FENCE_RE.match(text)
+    if fence:
+        text = fence.group(1).strip()
+        fixes.append("stripped_code_fence")
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        cleaned = _TRAILING_COMMA_RE.sub(r"\1", text)
+        if cleaned == text:
+            raise
+        parsed = json.loads(cleaned)
+        fixes.append("removed_trailing_commas")
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+        fixes.append("wrapped_single_object")
+    if not isinstance(parsed, list):
+        raise TypeError("LLM output is not a JSON array.")
+    return parsed, fixes
+
+
+def infer_unit(value: float, source_text: str) -> Optional[str]:
+    """Returns the unit written next to `value` in `source_text`, if exactly one such unit appears."""
+    units = {unit for number, unit in _NUMBER_WITH_UNIT_RE.findall(source_text) if float(number) == value}
+    return units.pop() if len(units) == 1 else None
+
+
+def repair_item(item: Dict, source_ref: str, source_text: Optional[str]) -> List[str]:
+    """
+    Applies deterministic fixes to a constraint item in place.
+
+    Fills a missing `source_ref` from the chunk it came from, normalizes operator
+    spellings such as "≥", and infers a missing unit for a numeric `value` from
+    the source text. Returns the names of the fixes applied.
+    """
+    fixes: List[str] = []
+    if not item.get("source_ref") and source_ref:
+        item["source_ref"] = source_ref
+        fixes.append("filled_source_ref")
+    operator = item.get("operator")
+    if isinstance(operator, str) and operator.strip() in OPERATOR_ALIASES:
+        item["operator"] = OPERATOR_ALIASES[operator.strip()]
+        fixes.append("normalized_operator")
+    value = item.get("value")
+    if type(value) in (int, float) and not item.get("unit") and source_text:
+        unit = infer_unit(value, source_text)
+        if unit:
+            item["unit"] = unit
+            fixes.append("inferred_unit")
+    return fixes
@@ -0,0 +1,138 @@
+"""
+Application-level logging setup for the agent and its servers.
+
+Nothing here runs at import time. The application (api_server, mcp_server,
+app.py, example scripts) calls `configure_logging()` once. Records then go
+through a `QueueHandler` to a background `QueueListener`, so request threads
+never block on stream or file I/O. Records can be rendered as one JSON object
+per line. Each record carries the `task_id`/`user_id` bound with
+`log_context()` in the thread (or context) that emitted it.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+_log_fields: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("agent_log_fields", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_lock = threading.Lock()
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s [%(task_id)s]: %(message)s"
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Tags every record emitted inside the block (in this context) with `fields`, e.g. task_id and user_id."""
+    token = _log_fields.set({**_log_fields.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _log_fields.reset(token)
+
+
+def current_log_context() -> Dict[str, Any]:
+    return dict(_log_fields.get())
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound log fields onto the record; runs in the emitting thread, before the record is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = _log_fields.get()
+        record.task_id = fields.get("task_id", "-")
+        record.user_id = fields.get("user_id", "-")
+        record.log_fields = fields
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, bound fields and exception text."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "log_fields", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # --- Keep msg/args unformatted so the listener thread does the formatting work ---
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def configure_logging(level: Optional[str] = None, json_format: Optional[bool] = None,
+                      log_file: Optional[str] = None, file_mode: str = "a") -> None:
+    """
+    Installs queue-based logging on the root logger. Calling it again replaces the previous setup.
+
+    Environment (used when the argument is None):
+        AGENT_LOG_LEVEL: root level, default INFO.
+        AGENT_LOG_FORMAT: "json" (default) or "text".
+        AGENT_LOG_FILE: also write records to this file (appended); unset = stderr only.
+    """
+    global _listener, _queue_handler
+    level = (level or os.getenv("AGENT_LOG_LEVEL", "INFO")).upper()
+    if json_format is None:
+        json_format = os.getenv("AGENT_LOG_FORMAT", "json").lower() != "text"
+    log_file = log_file if log_file is not None else os.getenv("AGENT_LOG_FILE")
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    targets = [logging.StreamHandler()]
+    if log_file:
+        targets.append(logging.FileHandler(log_file, mode=file_mode, encoding="utf-8"))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    with _lock:
+        _stop_locked()
+        log_queue: queue.Queue = queue.Queue(-1)
+        _queue_handler = _ContextQueueHandler(log_queue)
+        _queue_handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, *targets, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records and stops the background writer."""
+    with _lock:
+        _stop_locked()
+
+
+def _stop_locked():
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
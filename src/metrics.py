@@ -0,0 +1,194 @@
+"""
+Minimal Prometheus-compatible metrics for the agent and its servers.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format (0.0.4) by `render()`. The agent records state durations,
+LLM latency/token usage and repair outcomes here; `api_server` and
+`mcp_server` serve the result on `/metrics`. Values that already live
+elsewhere (cache stats, queue depth) are exported through callback gauges
+and read at scrape time.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Also reads series from `function()` at scrape time: a mapping of label-value tuples to values."""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._function is not None:
+            try:
+                values.update(self._function())
+            except Exception:
+                pass
+        values = list(values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # per-bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(v)) for k, v in self._series.items()]
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {int(values[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {int(values[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# --- Agent metrics ---
+STATE_DURATION = REGISTRY.register(Histogram(
+    "agent_state_duration_seconds", "Time spent in each agent state.", ["state"]))
+RUNS = REGISTRY.register(Counter(
+    "agent_runs_total", "Finished agent runs by final status.", ["status"]))
+LLM_CALL_DURATION = REGISTRY.register(Histogram(
+    "agent_llm_call_duration_seconds", "Latency of individual LLM HTTP requests.", ["stage", "model", "outcome"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "agent_llm_tokens_total", "LLM tokens reported in response.usage.", ["stage", "model", "kind"]))
+RELEVANCE_SKIPPED_CALLS = REGISTRY.register(Counter(
+    "agent_relevance_skipped_calls_total", "Extraction calls keyword routing would have made that the relevance filter skipped."))
+RELEVANCE_ADDED_CALLS = REGISTRY.register(Counter(
+    "agent_relevance_added_calls_total", "Extraction calls the relevance filter made beyond what keyword routing would have made."))
+REPAIR_ITEMS = REGISTRY.register(Counter(
+    "agent_repair_items_total", "Items leaving validation through repair, by outcome (local_repaired, llm_repaired, discarded).", ["outcome"]))
+LLM_CACHE_EVENTS = REGISTRY.register(Gauge(
+    "agent_llm_cache_events", "LLM response cache counters of this process (memory_hits, disk_hits, misses, ...).", ["event"]))
+LLM_CACHE_HIT_RATE = REGISTRY.register(Gauge(
+    "agent_llm_cache_hit_ratio", "LLM response cache hit rate of this process."))
+TASKS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "agent_tasks_in_flight", "Extraction tasks currently running.", ["server"]))
+TASK_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "agent_task_queue_depth", "Extraction tasks waiting for a worker.", ["server"]))
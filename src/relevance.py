@@ -0,0 +1,129 @@
+"""
+Local relevance scoring of document chunks against extraction goals.
+
+Keyword routing sends a chunk to a goal whenever one of the goal's keywords
+occurs in it, however incidental the mention. It also misses clauses that
+phrase the same requirement differently. `RelevanceIndex` ranks every chunk
+for every goal with Okapi BM25 over character n-grams. The query is the
+goal's description plus its keywords. Character n-grams need no word
+segmenter for Chinese text. Only the n-grams that occur in some goal query
+are counted, so scoring a document is a handful of `str.count` calls per
+chunk. No model, network or GPU is involved.
+
+Raw BM25 scores are divided by the score the goal's query text would get as
+a chunk of this document, so 1.0 is a chunk that matches the query as well as
+the query matches itself. `select_chunks` turns the ranking into routes: a
+chunk goes to a goal when its normalized score reaches both `min_score` and
+`threshold` times that goal's best chunk score. The absolute floor is what
+keeps a goal with no real match from being routed its least-bad chunk. With
+`top_k`, at most that many chunks per goal are kept.
+"""
+
+import math
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+NGRAM_SIZES = (2, 3)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def goal_query(goal: Dict) -> str:
+    """Query text for a goal: its description followed by its keywords."""
+    return " ".join([goal.get('description', '')] + list(goal.get('keywords', [])))
+
+
+def query_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> Set[str]:
+    """Distinct character n-grams of `text`, skipping any that span whitespace or punctuation."""
+    grams = set()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram.isalnum():
+                grams.add(gram)
+    return grams
+
+
+class RelevanceIndex:
+    """
+    BM25 statistics of a set of chunk texts, restricted to a fixed n-gram vocabulary.
+
+    Args:
+        texts: Chunk texts, in chunk order.
+        vocabulary: The n-grams that queries may contain; nothing else is counted.
+    """
+
+    def __init__(self, texts: Iterable[str], vocabulary: Set[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        # --- Shorter n-grams first: a longer one can only occur where its prefix does ---
+        ordered = sorted(vocabulary, key=len)
+        self.term_freqs: List[Dict[str, int]] = []
+        self.lengths: List[int] = []
+        self.doc_freqs: Dict[str, int] = {}
+        for text in texts:
+            tf: Dict[str, int] = {}
+            for gram in ordered:
+                if gram[:-1] in vocabulary and gram[:-1] not in tf:
+                    continue
+                count = text.count(gram)
+                if count:
+                    tf[gram] = count
+                    self.doc_freqs[gram] = self.doc_freqs.get(gram, 0) + 1
+            self.term_freqs.append(tf)
+            self.lengths.append(len(text))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def idf(self, gram: str) -> float:
+        df = self.doc_freqs.get(gram, 0)
+        return math.log((len(self.lengths) - df + 0.5) / (df + 0.5) + 1.0)
+
+    def _score(self, tf: Dict[str, int], length: int, weights: Dict[str, float]) -> float:
+        k1 = self.k1
+        norm = k1 * (1.0 - self.b + self.b * length / (self.avg_length or 1.0))
+        return sum(weight * tf[gram] * (k1 + 1.0) / (tf[gram] + norm) for gram, weight in weights.items() if gram in tf)
+
+    def scores(self, terms: Set[str]) -> List[float]:
+        """BM25 score of every chunk for a query made of `terms`."""
+        weights = {gram: self.idf(gram) for gram in terms if gram in self.doc_freqs}
+        return [self._score(tf, length, weights) for tf, length in zip(self.term_freqs, self.lengths)]
+
+    def self_score(self, query: str, terms: Set[str]) -> float:
+        """BM25 score `query` would get as a chunk of this index, counting its n-grams the document lacks too."""
+        return self._score({gram: query.count(gram) for gram in terms}, len(query), {gram: self.idf(gram) for gram in terms})
+
+
+def select_chunks(scores: Sequence[float], threshold: float, top_k: int = 0, min_score: float = 0.0) -> List[int]:
+    """
+    Indices of chunks scoring at least `min_score` and `threshold` x the best score (and > 0), best first,
+    capped at `top_k` (0 = no cap).
+    """
+    best = max(scores, default=0.0)
+    cutoff = max(threshold * best, min_score, 1e-12)
+    if best < cutoff:
+        return []
+    ranked = sorted((i for i, score in enumerate(scores) if score >= cutoff), key=lambda i: -scores[i])
+    return ranked[:top_k] if top_k > 0 else ranked
+
+
+def route_by_relevance(goals: Sequence[Dict], chunks: Sequence, threshold: float, top_k: int = 0,
+                       min_score: float = 0.0) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+    """
+    Routes chunks to goals by normalized relevance score (see the module docstring).
+
+    Returns:
+        A tuple `(chunk_goals, selected_per_goal)`: chunk id -> goal ids in plan
+        order (chunks routed to no goal are omitted), and goal id -> number of
+        chunks selected for it.
+    """
+    queries = {goal['id']: query_ngrams(goal_query(goal)) for goal in goals}
+    index = RelevanceIndex((chunk.text for chunk in chunks), set().union(*queries.values()) if queries else set())
+    chunk_goals: Dict[str, List[str]] = {}
+    selected_per_goal: Dict[str, int] = {}
+    for goal in goals:
+        terms = queries[goal['id']]
+        ideal = index.self_score(goal_query(goal), terms) or 1.0
+        selected = select_chunks([score / ideal for score in index.scores(terms)], threshold, top_k, min_score)
+        selected_per_goal[goal['id']] = len(selected)
+        for i in sorted(selected):
+            chunk_goals.setdefault(chunks[i].id, []).append(goal['id'])
+    return chunk_goals, selected_per_goal
@@ -0,0 +1,89 @@
+"""
+Precompiled JSON-Schema validator for extracted constraint items.
+
+`SchemaValidator` compiles the subset of draft-07 used by `OUTPUT_SCHEMA`
+(`type`, `enum`, `required`, `properties`, `items`) once into plain Python
+lookups, so the VALIDATION state can check tens of thousands of items per
+document without re-interpreting the schema for every item.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- JSON type name -> exact Python types produced by json.loads ---
+_JSON_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "null": (type(None),),
+    "object": (dict,),
+    "array": (list,),
+}
+_PYTHON_TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", type(None): "null", dict: "object", list: "array"}
+
+
+def _type_name(value: Any) -> str:
+    return _PYTHON_TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+class SchemaValidator:
+    """
+    Validator compiled from a JSON schema.
+
+    Errors are returned as strings prefixed with a JSON path, e.g.
+    `$.operator: 'approx' is not one of ['>=', '<=', ...]`.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        schema_type = schema.get("type")
+        names = [schema_type] if isinstance(schema_type, str) else list(schema_type or [])
+        self.type_label = "|".join(names)
+        # --- type() identity checks: bool must not pass as number, so subclasses are not accepted ---
+        self.allowed_types: Optional[frozenset] = frozenset(t for n in names for t in _JSON_TYPES[n]) if names else None
+        enum = schema.get("enum")
+        self.enum_values: Optional[List[Any]] = list(enum) if enum is not None else None
+        try:
+            self.enum_lookup = frozenset(enum) if enum is not None else None
+        except TypeError:
+            self.enum_lookup = None
+        self.required: Tuple[str, ...] = tuple(schema.get("required", ()))
+        self.properties: Dict[str, "SchemaValidator"] = {
+            name: SchemaValidator(sub) for name, sub in schema.get("properties", {}).items()
+        }
+        self.items: Optional["SchemaValidator"] = SchemaValidator(schema["items"]) if "items" in schema else None
+
+    def validate(self, value: Any, path: str = "$") -> List[str]:
+        """Returns every schema violation in `value`; an empty list means valid."""
+        errors: List[str] = []
+        self._check(value, path, errors)
+        return errors
+
+    def validate_batch(self, values: List[Any], path: str = "$") -> List[List[str]]:
+        """Validates a list of items in one pass, returning one error list per item (index-aligned, paths rooted at each item)."""
+        check = self._check
+        results = []
+        for value in values:
+            errors: List[str] = []
+            check(value, path, errors)
+            results.append(errors)
+        return results
+
+    def _check(self, value: Any, path: str, errors: List[str]):
+        if self.allowed_types is not None and type(value) not in self.allowed_types:
+            errors.append(f"{path}: expected {self.type_label}, got {_type_name(value)}")
+            return
+        if self.enum_values is not None:
+            in_enum = value in self.enum_lookup if self.enum_lookup is not None and value.__hash__ else value in self.enum_values
+            if not in_enum:
+                errors.append(f"{path}: {value!r} is not one of {self.enum_values}")
+        if type(value) is dict:
+            # --- Required fields follow the agent's rule: present and non-empty ---
+            for field in self.required:
+                if not value.get(field):
+                    errors.append(f"{path}.{field}: Missing required field")
+            for name, sub in self.properties.items():
+                if name in value:
+                    sub._check(value[name], f"{path}.{name}", errors)
+        elif type(value) is list and self.items is not None:
+            for i, element in enumerate(value):
+                self.items._check(element, f"{path}[{i}]", errors)
@@ -0,0 +1,60 @@
+"""
+Single-pass JSON encoding of extraction results.
+
+Results travel from `_finalize` to the HTTP response as plain Python objects
+and are encoded exactly once, here. `orjson` is used when it is installed
+(several times faster than the standard library on large results); otherwise
+the encoding falls back to `json` with the same compact, UTF-8 output.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# --- Lines are sent in blocks of about this many bytes rather than one write per line ---
+NDJSON_BLOCK_SIZE = 64 * 1024
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=str)
+        except orjson.JSONEncodeError:
+            # --- orjson rejects integers beyond 64 bits (e.g. a "value" of 10**23), which are valid JSON ---
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def ndjson_line(event: str, data: Any) -> bytes:
+    """One `{"event": ..., "data": ...}` line of an NDJSON stream."""
+    return dumps_bytes({"event": event, "data": data}) + b"\n"
+
+
+def iter_result_ndjson(header: Dict[str, Any], result: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    Streams an extraction result: a `task` line with `header` plus the result
+    without its items, then one `constraint` line per validated item.
+    """
+    items: Iterable[Dict[str, Any]] = result.get("validated_items", [])
+    block = [ndjson_line("task", {**header, "result": {k: v for k, v in result.items() if k != "validated_items"}})]
+    size = len(block[0])
+    for item in items:
+        line = ndjson_line("constraint", item)
+        block.append(line)
+        size += len(line)
+        if size >= NDJSON_BLOCK_SIZE:
+            yield b"".join(block)
+            block, size = [], 0
+    if block:
+        yield b"".join(block)
@@ -0,0 +1,67 @@
+"""
+Shared SQLite plumbing for the agent's embedded stores.
+
+The constraint store, chunk result store, checkpoint store and LLM response
+cache each keep one SQLite file. They all open it the same way: create the
+parent directory, connect with `check_same_thread=False` so API worker
+threads can share the connection behind a lock, and switch to WAL with
+`synchronous=NORMAL`. Every store holds data that is either derivable or
+cheap to lose on power failure, so the per-commit fsync is skipped.
+
+Default files live under `AGENT_DATA_DIR` (default `data`) instead of the
+working directory; each store's own `*_PATH` variable still overrides it.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+def data_path(filename: str) -> str:
+    """Default location of a store file: `filename` under AGENT_DATA_DIR."""
+    return os.path.join(os.getenv("AGENT_DATA_DIR", "data"), filename)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens `path` for sharing across threads, creating its directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteStore:
+    """
+    Base class of a store backed by one SQLite file, serialised by `_lock`.
+
+    Args:
+        path: SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_stores: Dict[Tuple[type, str], Any] = {}
+_shared_stores_lock = threading.Lock()
+
+
+def shared_store(store_class: Type[T], path: str, **kwargs: Any) -> T:
+    """Returns the process-wide `store_class` instance for `path`, creating it with `kwargs` on first use."""
+    with _shared_stores_lock:
+        key = (store_class, path)
+        if key not in _shared_stores:
+            _shared_stores[key] = store_class(path, **kwargs)
+        return _shared_stores[key]
@@ -0,0 +1,46 @@
+"""
+Startup helpers that keep cold-start cost off the first request.
+
+Importing the agent is kept light: the `openai` SDK, the response cache and
+the client pool are all created lazily. A server that wants its first request
+to be as fast as its hundredth calls these helpers before it accepts traffic:
+
+- `preload_modules()` imports the heavy optional packages. It creates no
+  threads, sockets or SQLite handles, so it is safe to run in a prefork master
+  (see `serve_preforked` in app.py) and workers share those pages copy-on-write.
+- `warm_up()` runs in each worker process. It preloads modules, opens the
+  response cache, and builds the pooled client for the default LLM endpoint.
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from .agent import LLMClient, LLM_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+
+def preload_modules() -> float:
+    """Imports openai/httpx (when installed); returns the seconds it took."""
+    started = time.perf_counter()
+    if LLM_AVAILABLE:
+        import httpx  # noqa: F401
+        import openai  # noqa: F401
+    return time.perf_counter() - started
+
+
+def warm_up(base_url: Optional[str] = None, api_key: Optional[str] = None) -> Dict[str, float]:
+    """Prepares this process for its first request; returns the time spent per step."""
+    timings = {"preload_modules": preload_modules()}
+
+    started = time.perf_counter()
+    client = LLMClient(base_url=base_url, api_key=api_key)
+    if client.registry is not None:
+        # --- The lease only builds the client and its pool; no request is sent ---
+        with client.registry.lease(client.base_url, client.api_key):
+            pass
+    timings["llm_client"] = time.perf_counter() - started
+
+    logger.info("Warm-up complete: %s", ", ".join(f"{step} {seconds * 1000:.0f}ms" for step, seconds in timings.items()))
+    return timings
@@ -0,0 +1,118 @@
+"""
+Bounded background execution for agent runs in the API server.
+
+`ExtractionAgentFinal.run()` is fully synchronous, so the server hands it to
+a `TaskRunner` instead of calling it on the event loop. The runner caps the
+number of running plus queued tasks and rejects new work once full, so
+latency stays bounded under load. `TaskStore` keeps the state and result of
+asynchronously submitted tasks until they are fetched or expire.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the runner already holds `max_workers + max_queue` tasks."""
+
+
+class TaskRunner:
+    """
+    Thread pool with admission control.
+
+    Args:
+        max_workers: Number of agent runs executing concurrently.
+        max_queue: Number of additional runs allowed to wait for a worker.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise QueueFullError(f"Task queue is full ({self._pending} tasks pending).")
+            self._pending += 1
+        try:
+            future = self._pool.submit(self._run, fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "capacity": self.max_workers + self.max_queue,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+# --- `rejected`: never queued, because the queue was full at submission ---
+FINISHED_STATUSES = ("completed", "failed", "rejected")
+
+
+class TaskStore:
+    """
+    In-memory registry of asynchronously submitted tasks.
+
+    Finished tasks are dropped `ttl_seconds` after completion; at most
+    `max_entries` tasks are kept, oldest first out.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str, **fields: Any):
+        with self._lock:
+            self._prune()
+            self._tasks[task_id] = {"task_id": task_id, "status": "queued", "created_at": time.time(), "finished_at": None, "response": None, **fields}
+
+    def update(self, task_id: str, **fields: Any):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                task.update(fields)
+                if fields.get("status") in FINISHED_STATUSES:
+                    task["finished_at"] = time.time()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def _prune(self):
+        now = time.time()
+        expired = [tid for tid, t in self._tasks.items() if t["finished_at"] and now - t["finished_at"] > self.ttl_seconds]
+        for tid in expired:
+            del self._tasks[tid]
+        while len(self._tasks) >= self.max_entries:
+            del self._tasks[next(iter(self._tasks))]
@@ -1,8 +1,9 @@
 #!/bin/bash
 
 # Start the FastAPI server (primary service)
-echo "Starting FastAPI server on port 8000..."
-uvicorn src.api_server:app --host 0.0.0.0 --port 8000 &
+# AGENT_SERVER_WORKERS > 1 preloads the app once and forks that many workers (see app.py)
+echo "Starting FastAPI server on port 8000 with ${AGENT_SERVER_WORKERS:-1} worker(s)..."
+PORT=8000 python app.py &
 
 # Check if the Gradio UI should be run
 if [ "$RUN_GRADIO_UI" = "true" ]; then